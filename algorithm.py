@@ -4,49 +4,150 @@
 import argparse  # so we can parse
 # the command line
 import sys  # so we can write the output file
-import queue  # used to keep track of all the arcs in the AC-3 algo (in CSP class)
+from collections import deque  # worklist of arcs in the AC-3 algo
 import time  # to see how long it takes for the algorithm to solve a problem
+from array import array  # compact storage for the domain bitmasks and the undo trail
+from bitmask_solver import SolveTimeout  # raised when the search runs past its time limit
+from bitmask_solver import SearchStats  # optional node / backtrack / phase time counters
+from bitmask_solver import CHECK_INTERVAL  # search nodes between two clock reads
+import puzzle_io  # streaming reader for puzzle files
+import bitmask_solver  # shared viability check
+import propagation  # singles / pairs / pointing propagation before (and optionally during) the search
+import geometry  # unit / peer tables of every board order (9x9, 16x16, 25x25, ...)
+
+# Cells are indexed as row * size + col. The unit and peer tables come from geometry.py, one set per board order.
+# Domains are stored as bitmasks (bit n - 1 set when n is still in the domain), as wide as the board needs
+NINE = geometry.get_geometry(3)
+
+
+class DomainState:  # compact search state shared by every variable of a CSP
+    def __init__(self, geo=NINE):
+        self.geo = geo
+        self.bit_count = geo.bit_count
+        typecode = 'H' if geo.size <= 16 else 'L'  # 16 bit masks up to 16x16, 32 bit above
+        self.domains = array(typecode, [geo.all_digits] * geo.cells)  # domain bitmask of every cell
+        self.values = bytearray(geo.cells)  # current value of every cell (0 = unassigned)
+        self.trail = array(typecode)  # (cell, old domain mask) pairs, popped to undo domain changes
+        # MRV bucket queue over the unassigned variables: buckets[domain size][degree] holds their cells and is kept
+        # up to date as domains shrink (set_mask) and grow back (undo), so picking the next variable needs no rescan
+        self.degrees = bytearray(geo.cells)  # constraints of every cell with other unassigned cells, fixed once built
+        self.queued = bytearray(geo.cells)  # 1 for the cells that are in a bucket
+        self.buckets = [[set() for degree in range(len(geo.peers[0]) + 1)] for size in range(geo.size + 1)]
+        self.bucket_counts = [0] * (geo.size + 1)  # number of queued cells of each domain size
+
+    def get_domain(self, cell):
+        return self.geo.digits_of[self.domains[cell]]
+
+    def set_mask(self, cell, mask):  # changes a domain and records the old mask on the trail
+        trail = self.trail
+        trail.append(cell)
+        trail.append(self.domains[cell])
+        if self.queued[cell]:
+            self.move(cell, self.domains[cell], mask)
+        self.domains[cell] = mask
+
+    def enqueue(self, cell):  # puts an unassigned cell into the bucket of its domain size and degree
+        size = self.bit_count[self.domains[cell]]
+        self.buckets[size][self.degrees[cell]].add(cell)
+        self.bucket_counts[size] += 1
+        self.queued[cell] = 1
+
+    def dequeue(self, cell):
+        size = self.bit_count[self.domains[cell]]
+        self.buckets[size][self.degrees[cell]].discard(cell)
+        self.bucket_counts[size] -= 1
+        self.queued[cell] = 0
+
+    def move(self, cell, old_mask, new_mask):  # moves a queued cell whose domain changes to its new bucket
+        old_size = self.bit_count[old_mask]
+        new_size = self.bit_count[new_mask]
+        if old_size != new_size:
+            degree = self.degrees[cell]
+            self.buckets[old_size][degree].discard(cell)
+            self.buckets[new_size][degree].add(cell)
+            self.bucket_counts[old_size] -= 1
+            self.bucket_counts[new_size] += 1
+
+    def select(self):  # queued cell with the smallest domain (MRV), ties go to the highest degree. None if empty.
+        # A cell whose domain is empty comes first, the search then backtracks on it straight away
+        for size in range(len(self.bucket_counts)):
+            if self.bucket_counts[size]:
+                for degree_bucket in reversed(self.buckets[size]):
+                    if degree_bucket:
+                        return next(iter(degree_bucket))
+        return None
+
+    def prune(self, cell, value):
+        mask = self.domains[cell]
+        bit = 1 << (value - 1)
+        if mask & bit:
+            self.set_mask(cell, mask & ~bit)
+
+    def mark(self):  # the current trail position, to undo back to later
+        return len(self.trail)
+
+    def undo(self, mark):  # restores every domain changed since mark by popping the trail
+        trail = self.trail
+        domains = self.domains
+        queued = self.queued
+        while len(trail) > mark:
+            mask = trail.pop()
+            cell = trail.pop()
+            if queued[cell]:
+                self.move(cell, domains[cell], mask)
+            domains[cell] = mask
 
 
 # Variable Class
 class Variable:
     # constructor
-    def __init__(self, value, location, domain):
-        self.value = value
+    def __init__(self, value, location, domain, state=None):
         self.location = location
-        self.domain = domain
+        self.state = state if state is not None else DomainState()  # value and domain live in the shared state
+        self.index = location[0] * self.state.geo.size + location[1]  # position in the peer/unit tables and in the
+        # domain state
+        self.state.values[self.index] = value
+        self.set_domain(domain)
         self.block_num = self.find_block_number()  # Uses the row and column to find the block number
 
     # Getter methods
     def get_value(self):
-        return self.value
+        return self.state.values[self.index]
 
     def get_location(self):
         return self.location
 
-    def get_domain(self):
-        return self.domain
+    def get_domain(self):  # sorted tuple of the values left in the domain
+        return self.state.get_domain(self.index)
+
+    def get_domain_size(self):
+        return self.state.bit_count[self.state.domains[self.index]]
 
     def get_block_num(self):
         return self.block_num
 
+    def get_index(self):
+        return self.index
+
     # Setter Methods
     def update_value(self, new_value):
-        self.value = new_value
+        self.state.values[self.index] = new_value
 
     def prune_domain(self, value):
-        self.domain.remove(value)
+        self.state.prune(self.index, value)
 
     def set_domain(self, new_domain):
-        self.domain = new_domain
+        mask = 0
+        for value in new_domain:
+            mask |= 1 << (value - 1)
+        self.state.set_mask(self.index, mask)
 
     def add_domain_val(self, value):
-        self.domain.append(value)  # appends the value to the end of the list
-        self.domain.sort()  # sorts the list in increasing order from 1 - 9
+        self.state.set_mask(self.index, self.state.domains[self.index] | (1 << (value - 1)))
 
     # Auxiliary methods
     def __str__(self):
-        return "(" + str(self.location[0]) + ", " + str(self.location[1]) + ") = " + str(self.value)
+        return "(" + str(self.location[0]) + ", " + str(self.location[1]) + ") = " + str(self.get_value())
 
     def __eq__(self, other):  # Returns true if the two variables have the same location (row and column) in the puzzle
         self_row = self.location[0]
@@ -63,30 +164,7 @@ class Variable:
         return self_row != other_row or self_col != other_col
 
     def find_block_number(self):  # uses the row and column to assign a block number to a variable
-        row = self.location[0]
-        col = self.location[1]
-        if 0 <= row <= 2:
-            if 0 <= col <= 2:
-                block_num = 0
-            elif 3 <= col <= 5:
-                block_num = 1
-            elif 6 <= col <= 8:
-                block_num = 2
-        elif 3 <= row <= 5:
-            if 0 <= col <= 2:
-                block_num = 3
-            elif 3 <= col <= 5:
-                block_num = 4
-            elif 6 <= col <= 8:
-                block_num = 5
-        else:
-            if 0 <= col <= 2:
-                block_num = 6
-            elif 3 <= col <= 5:
-                block_num = 7
-            elif 6 <= col <= 8:
-                block_num = 8
-        return block_num
+        return self.state.geo.block_of[self.index]
 
 
 # Constraint Class
@@ -129,15 +207,20 @@ class Constraint:  # Manages a set of variables that cannot equal each other sin
 # ConstraintCollection class
 class ConstraintCollection:  # holds all the constraints in the CSP
     def __init__(self, collection):
-        self.constraints = collection  # holds of list of constraints
+        self.constraints = []  # holds of list of constraints
+        self.var_constraints = {}  # cell index -> constraints that cell is involved in
+        for constraint in collection:
+            self.update_collection(constraint)
 
     # Getter methods
     def get_collection(self):
         return self.constraints
 
     # Setter methods
-    def update_collection(self, constraint):  # adds a constraint to the array
+    def update_collection(self, constraint):  # adds a constraint to the array and indexes it by both of its cells
         self.constraints.append(constraint)
+        for var in constraint.get_variables():
+            self.var_constraints.setdefault(var.get_index(), []).append(constraint)
 
     def constraint_exists(self, constraint):  # checks if a constraint already exists in the array - to avoid repeats
         for constraint_ind in range(len(self.constraints)):
@@ -147,68 +230,53 @@ class ConstraintCollection:  # holds all the constraints in the CSP
         return False
 
     def find_var_constraints(self, unassigned_var):  # given an unassigned var, a list of constraints will
-        # output that the var is involved with
-        var_constraints = []
-        for constraint_ind in range(len(self.constraints)):
-            constraint = self.constraints[constraint_ind]
-            constraint_variables = constraint.get_variables()
-            for var_ind in range(len(constraint)):
-                var = constraint_variables[var_ind]
-                if unassigned_var == var:
-                    var_constraints.append(constraint)
-        return var_constraints
-
-    def have_Constraint(self, var1, var2):  # checks the database of constraints to see
+        # output that the var is involved with (looked up by cell index instead of scanning every constraint)
+        return self.var_constraints.get(unassigned_var.get_index(), [])
+
+    def have_Constraint(self, var1, var2):  # checks the peer table to see
         # if two variables have constraints with each other
-        var1_constraints = self.find_var_constraints(var1)
-        for ind in range(len(var1_constraints)):
-            constraint = var1_constraints[ind]
-            constraint_vars = constraint.get_variables()
-            for var_ind in range(len(constraint_vars)):
-                const_var = constraint_vars[var_ind]
-                if var2 == const_var:
-                    return True
-        return False
+        return var2.get_index() in var1.state.geo.peer_sets[var1.get_index()]
 
     def __len__(self):
         return len(self.constraints)
 
 
 class Assignment:  # manages the list of assignments given to each variable during the backtracking algorithm search
-    def __init__(self, initial):
+    def __init__(self, initial, num_cells=NINE.cells):
         self.assignments = initial
+        self.assigned = bytearray(num_cells)  # 1 for every cell index that is in the assignment
+        for var in initial:
+            self.assigned[var.get_index()] = 1
 
     def get_assignments(self):
         return self.assignments
 
     def add_assignment(self, var):  # adds a variable to the assignment list
         self.assignments.append(var)
+        self.assigned[var.get_index()] = 1
 
     def remove_assignment(self, var):  # removes an assignment, if there is a failure that occurs
         var.update_value(0)
-        self.assignments.remove(var)
+        self.assigned[var.get_index()] = 0
+        if self.assignments[-1] is var:  # backtracking always removes the latest assignment first
+            self.assignments.pop()
+        else:
+            self.assignments.remove(var)
 
     def __len__(self):
         return len(self.assignments)
 
     def is_Consistent(self, var, constraint_network):  # checks if the variable value is consistent
-        # with the previous assignment values
-        for ind in range(len(self.assignments)):
-            past_assignment = self.assignments[ind]
-            if constraint_network.have_Constraint(var, past_assignment):
-                past_assignment_val = past_assignment.get_value()
-                var_val = var.get_value()
-                if past_assignment_val == var_val:
-                    return False
+        # with the previous assignment values (only the peers of the variable can conflict with it)
+        var_val = var.get_value()
+        values = var.state.values
+        for peer_ind in var.state.geo.peers[var.get_index()]:
+            if self.assigned[peer_ind] and values[peer_ind] == var_val:
+                return False
         return True
 
     def is_Assigned(self, variable):
-        # Traverse through each variable in assignments and return True if the given variable is already assigned
-        for ind in range(len(self.assignments)):
-            assigned_var = self.assignments[ind]
-            if variable == assigned_var:
-                return True
-        return False
+        return self.assigned[variable.get_index()] == 1
 
     def __str__(self):
         output = ""
@@ -221,14 +289,20 @@ class Assignment:  # manages the list of assignments given to each variable duri
 
 
 class CSP:
-    def __init__(self, puzzle):  # keeps track of the entire CSP
+    def __init__(self, puzzle, stats=None, propagate=propagation.ROOT):  # keeps track of the entire CSP
+        # puzzle is a 2D list of any board order (9x9, 16x16, ...). Raises ValueError if no order fits its size
+        self.geo = geometry.for_board(bitmask_solver.flatten(puzzle))
         self.unassigned_vars = []
         self.assigned_vars = []
         self.num_vars = 0
-        self.blocks = {0: [], 1: [], 2: [], 3: [], 4: [], 5: [], 6: [], 7: [], 8: []}
-        self.rows = {0: [], 1: [], 2: [], 3: [], 4: [], 5: [], 6: [], 7: [], 8: []}
-        self.columns = {0: [], 1: [], 2: [], 3: [], 4: [], 5: [], 6: [], 7: [], 8: []}
+        self.blocks = {num: [] for num in range(self.geo.size)}
+        self.rows = {num: [] for num in range(self.geo.size)}
+        self.columns = {num: [] for num in range(self.geo.size)}
         self.constraint_collection = ConstraintCollection([])
+        self.state = DomainState(self.geo)  # domains and values of every variable
+        self.deadline = None  # time.perf_counter() value the search has to finish by (set by backtracking_search)
+        self.stats = stats  # optional SearchStats, every method that updates it checks for None first
+        self.propagation = propagate  # one of propagation.LEVELS, used by backtracking_search and backtrack
 
         for row in range(len(puzzle)):  # Traverses through the puzzle and creates/stores
             # unassigned and assigned variables in the given puzzle
@@ -236,8 +310,8 @@ class CSP:
                 value = puzzle[row][col]
                 location = row, col
                 if value == 0:  # if so, then the variable is unassigned
-                    domain = [1, 2, 3, 4, 5, 6, 7, 8, 9]
-                    unassigned_var = Variable(value, location, domain)
+                    domain = range(1, self.geo.size + 1)
+                    unassigned_var = Variable(value, location, domain, self.state)
 
                     self.num_vars += 1  # keeps track of the number of unassigned vars from the beginning
                     # (before the backtracking search algorithm starts)
@@ -250,41 +324,28 @@ class CSP:
                     self.unassigned_vars.append(unassigned_var)
                 else:  # the variable already has a value from the beginning. Need to store as an assigned variable
                     domain = [value]
-                    assigned_var = Variable(value, location, domain)
+                    assigned_var = Variable(value, location, domain, self.state)
                     self.assigned_vars.append(assigned_var)
 
-        for unassigned_ind in range(len(self.unassigned_vars)):  # goes through each unassigned variable and
-            # creates constraints for each variable with other unassigned vars
-            # by searching through the block, row, and column that it is in
-            variable = self.unassigned_vars[unassigned_ind]
-            var_row = variable.get_location()[0]
-            var_col = variable.get_location()[1]
-            var_block_num = variable.get_block_num()
-
-            # Add neighbor variables from each unit into list of unassigned vars that have constraints with this var
-            neighbor_vars = []
-            for neighbor_ind in range(len(self.blocks[var_block_num])):  # Traverses through each block in search
-                # and add each neighbor that isn't variable to the list of vars that have a constraint with variable
-                neighbor = self.blocks[var_block_num][neighbor_ind]
-                if variable != neighbor:
-                    neighbor_vars.append(neighbor)
-            for neighbor_ind in range(len(self.rows[var_row])):  # does the same for all row that the
-                # unassigned var is in
-                neighbor = self.rows[var_row][neighbor_ind]
-                if variable != neighbor:
-                    neighbor_vars.append(neighbor)
-            for neighbor_ind in range(len(self.columns[var_col])):  # same process for the column the var is in
-                neighbor = self.columns[var_col][neighbor_ind]
-                if variable != neighbor:
-                    neighbor_vars.append(neighbor)
-
-            for neighbor_ind in range(len(neighbor_vars)):  # traverses through each neighbor
-                # and creates a new constraint. Adds constraint to the constraint collection
-                neighbor = neighbor_vars[neighbor_ind]
-                new_constraint = Constraint([variable, neighbor])
-                if not self.constraint_collection.constraint_exists(new_constraint):  # checks the constraint network
-                    # to see if the constraint does not already exist
-                    self.constraint_collection.update_collection(new_constraint)
+        self.cells = [None] * self.geo.cells  # every variable by cell index, used with the peer table
+        for var in self.unassigned_vars + self.assigned_vars:
+            self.cells[var.get_index()] = var
+
+        for unassigned_var in self.unassigned_vars:  # creates one constraint per pair of unassigned peers
+            # using the static peer table. Each pair is only built from its lower index, so no duplicate check
+            # against the collection is needed
+            var_ind = unassigned_var.get_index()
+            for peer_ind in self.geo.peers[var_ind]:
+                neighbor = self.cells[peer_ind]
+                if peer_ind > var_ind and neighbor.get_value() == 0:
+                    self.constraint_collection.update_collection(Constraint([unassigned_var, neighbor]))
+
+        self.unassigned_pos = {}  # cell index -> position in unassigned_vars, for O(1) removal
+        for pos, unassigned_var in enumerate(self.unassigned_vars):  # fills the MRV buckets of the domain state
+            var_ind = unassigned_var.get_index()
+            self.unassigned_pos[var_ind] = pos
+            self.state.degrees[var_ind] = len(self.constraint_collection.find_var_constraints(unassigned_var))
+            self.state.enqueue(var_ind)
 
     def __len__(self):
         return self.num_vars
@@ -293,171 +354,116 @@ class CSP:
         return self.constraint_collection
 
     def select_unassigned_var(self):  # selects a new variable based on the MRV heuristic and degree heuristics
-        next_var = None
-        for ind in range(len(self.unassigned_vars)):
-            ordered_domains = self.minimum_remaining_values()  # uses MRV to find all the domain lengths
-            # for each unassigned variable
-
-            length = 1  # starts with the variables with the smallest domain
-            next_var_found = False
-            while not next_var_found:
-                candidates = ordered_domains[length]  # retrieves the singular var or list of variables
-                # that have a domain of that length
-                if len(candidates) > 1:  # checks if multiple variables have the same domain length - there's a tie
-                    next_var = self.degree_heuristic(candidates)  # if so, degree heuristics is used to
-                    # find the next var
-                    next_var_found = True
-                elif len(candidates) == 1:  # in the case there is no tie
-                    next_var = candidates[0]
-                    next_var_found = True
-                else:  # if there are no variables with that domain length
-                    length += 1
-        return next_var
-
-    def degree_heuristic(self, domain_lengths):  # chooses the most constrained variable given a list of variables
-        # that were tied in terms of domain lengths
-        constraints = self.count_constraints(domain_lengths)  # retrieves a dict of all of the variables
-        # associated with the number of constraints each of them hold with other unassigned vars
-
-        next_var = None
-        max_num_constraints = -1
-        for constraint_num in constraints.keys():
-            if constraint_num >= max_num_constraints:
-                max_num_constraints = constraint_num
-        next_var_found = False
-        while not next_var_found:
-            max_constraint_vars = constraints[max_num_constraints]
-            if len(max_constraint_vars) >= 1:
-                next_var = max_constraint_vars[len(max_constraint_vars) - 1]
-                max_constraint_vars.pop()
-                next_var_found = True
-            else:
-                max_num_constraints -= 1
+        # The domain state keeps the unassigned variables in buckets by domain size and degree (number of
+        # constraints with other unassigned variables), so this is a lookup instead of a scan over every variable
+        if self.stats is not None:
+            start = time.perf_counter()
+        cell = self.state.select()
+        next_var = self.cells[cell] if cell is not None else None
+        if self.stats is not None:
+            self.stats.add_time("select", time.perf_counter() - start)
         return next_var
 
-    def count_constraints(self, tied_vars):
-        var_constraints = {}
-        for var_ind in range(len(tied_vars)):
-            var = tied_vars[var_ind]
-            count = len(self.constraint_collection.find_var_constraints(var))
-            if count not in var_constraints.keys():
-                var_constraints[count] = [var]
-            else:
-                var_constraints[count].append(var)
-        return var_constraints
-
     def eliminate_domain_values(self):
-        for unassigned_var_ind in range(len(self.unassigned_vars)):
-            unassigned_var = self.unassigned_vars[unassigned_var_ind]
-            for assigned_var_ind in range(len(self.assigned_vars)):
-                assigned_var = self.assigned_vars[assigned_var_ind]
-                assigned_var_row = assigned_var.get_location()[0]
-                assigned_var_col = assigned_var.get_location()[1]
-                assigned_var_block_num = assigned_var.get_block_num()
-
-                unassigned_var_row = unassigned_var.get_location()[0]
-                unassigned_var_col = unassigned_var.get_location()[1]
-                unassigned_var_block_num = unassigned_var.get_block_num()
-
-                if unassigned_var_row == assigned_var_row or unassigned_var_col == assigned_var_col or \
-                        unassigned_var_block_num == assigned_var_block_num:
-                    assigned_var_value = assigned_var.get_value()
-                    unassigned_var_domain = unassigned_var.get_domain()
-                    if assigned_var_value in unassigned_var_domain:
-                        unassigned_var.prune_domain(assigned_var_value)
-
-    def minimum_remaining_values(self):
-        domains_ordered = {1: [], 2: [], 3: [], 4: [], 5: [], 6: [], 7: [], 8: [], 9: []}
-        for var_ind in range(len(self.unassigned_vars)):
-            var = self.unassigned_vars[var_ind]
-            domain_length = len(var.get_domain())
-            domains_ordered[domain_length].append(var)
-        return domains_ordered
-
-    def remove_unassigned_var(self, unassigned_var):
-        for var_ind in range(len(self.unassigned_vars)):
-            if unassigned_var == self.unassigned_vars[var_ind]:
-                self.unassigned_vars[var_ind], self.unassigned_vars[len(self.unassigned_vars) - 1] = \
-                    self.unassigned_vars[len(self.unassigned_vars) - 1], self.unassigned_vars[var_ind]
-        self.unassigned_vars.pop()
+        for unassigned_var in self.unassigned_vars:  # removes the value of every given peer from the domain
+            unassigned_var_domain = unassigned_var.get_domain()
+            for peer_ind in self.geo.peers[unassigned_var.get_index()]:
+                assigned_var_value = self.cells[peer_ind].get_value()
+                if assigned_var_value != 0 and assigned_var_value in unassigned_var_domain:
+                    unassigned_var.prune_domain(assigned_var_value)
+
+    def remove_unassigned_var(self, unassigned_var):  # swaps the variable with the last one and pops it
+        var_ind = unassigned_var.get_index()
+        pos = self.unassigned_pos.pop(var_ind)
+        last_var = self.unassigned_vars.pop()
+        if last_var is not unassigned_var:
+            self.unassigned_vars[pos] = last_var
+            self.unassigned_pos[last_var.get_index()] = pos
+        self.state.dequeue(var_ind)
 
     def forward_checking(self, unassigned_var, assignment):
-        # print("X: ", unassigned_var)
-        # print()
+        if self.stats is not None:
+            start = time.perf_counter()
         unassigned_var_val = unassigned_var.get_value()
-        constraints = self.constraint_collection.find_var_constraints(unassigned_var)
-        # print("X's Constraints: ")
-        # for ind in range(len(constraints)):
-        #     print(constraints[ind])
-        # print()
         inferences = {}  # holds all the variables and their new domains due to pruning
-        for ind in range(len(constraints)):
-            constraint = constraints[ind]
-            constraint_vars = constraint.get_variables()
-            for var_ind in range(len(constraint_vars)):
-                variable = constraint_vars[var_ind]
-                var_domain = variable.get_domain()
-                var_location = variable.get_location()
-                pruned_vals = []
-                if not assignment.is_Assigned(variable):
-                    if unassigned_var != variable:
-                        if unassigned_var_val in var_domain:
-                            pruned_vals.append(unassigned_var_val)
-                            # print("Y: ", variable)
-                            # print("Y's Domain: ", var_domain)
-                            # print()
-                            if len(var_domain) == 1:  # checks if we would prune the last val and result to a failure
-                                #  print("Here")
-                                return False, inferences  # the value assignment to this unassigned variable failed
-                            inferences[var_location] = pruned_vals
+        for peer_ind in self.geo.peers[unassigned_var.get_index()]:  # only the peers can be affected by the
+            # assignment
+            variable = self.cells[peer_ind]
+            if variable.get_value() != 0:  # given clues and variables already in the assignment are skipped
+                continue
+            var_domain = variable.get_domain()
+            if unassigned_var_val in var_domain:
+                if len(var_domain) == 1:  # checks if we would prune the last val and result to a failure
+                    if self.stats is not None:
+                        self.stats.add_time("forward_checking", time.perf_counter() - start)
+                    return False, inferences  # the value assignment to this unassigned variable failed
+                inferences[variable.get_location()] = [unassigned_var_val]
+        if self.stats is not None:
+            self.stats.pruned += len(inferences)
+            self.stats.add_time("forward_checking", time.perf_counter() - start)
         return True, inferences
 
-    def find_unassigned_var(self, var_location):
-        for ind in range(len(self.unassigned_vars)):
-            unassigned_var = self.unassigned_vars[ind]
-            unassigned_var_loc = unassigned_var.get_location()
-            unassigned_var_row = unassigned_var_loc[0]
-            unassigned_var_col = unassigned_var_loc[1]
-            if unassigned_var_row == var_location[0] and unassigned_var_col == var_location[1]:
-                return unassigned_var
-        return None
+    def find_unassigned_var(self, var_location):  # looks the variable up by cell index
+        var = self.cells[var_location[0] * self.geo.size + var_location[1]]
+        if var is None or var.get_value() != 0:
+            return None
+        return var
 
-    def apply_inferences(self, inferences):
-        connected_vars_locations = inferences.keys()
-        for var_loc in connected_vars_locations:
+    def apply_inferences(self, inferences):  # prunes the inferred values, every change goes on the state's trail
+        for var_loc in inferences.keys():
             connected_var = self.find_unassigned_var(var_loc)
             if connected_var is not None:
-                pruned_vals = inferences[var_loc]
-                for val in pruned_vals:
+                for val in inferences[var_loc]:
                     connected_var.prune_domain(val)
 
     def reverse_inferences(self, inferences):
-        connected_vars_locations = inferences.keys()
-        for var_loc in connected_vars_locations:
+        for var_loc in inferences.keys():
             connected_var = self.find_unassigned_var(var_loc)
             if connected_var is not None:
-                pruned_vals = inferences[var_loc]
-                for val in pruned_vals:
+                for val in inferences[var_loc]:
                     connected_var.add_domain_val(val)
 
+    def propagate(self):  # runs propagation.propagate over the domains and narrows them to what it finds. Cells it
+        # fills are left unassigned with a single value domain, so the search assigns them without branching.
+        # Every change goes through set_mask and can be undone. Returns False if the puzzle has no solution from here
+        if self.stats is not None:
+            start = time.perf_counter()
+        state = self.state
+        board = list(state.values)
+        cands = [0 if board[cell] else state.domains[cell] for cell in range(self.geo.cells)]
+        consistent = propagation.propagate(board, cands)
+        if consistent:
+            for cell in range(self.geo.cells):
+                if state.values[cell] == 0:
+                    mask = 1 << (board[cell] - 1) if board[cell] else cands[cell]
+                    if mask != state.domains[cell]:
+                        state.set_mask(cell, mask)
+        if self.stats is not None:
+            self.stats.add_time("propagate", time.perf_counter() - start)
+        return consistent
+
     def add_unassigned_var(self, unassigned_var):
+        self.unassigned_pos[unassigned_var.get_index()] = len(self.unassigned_vars)
         self.unassigned_vars.append(unassigned_var)
+        self.state.enqueue(unassigned_var.get_index())
 
 
-def file_reader(file_name):
+def file_reader(file_name, order=geometry.DEFAULT_ORDER):  # reads a single grid of size lines of size numbers
+    # (9-line grid by default), see puzzle_io.read_puzzles for files of many puzzles
+    size = geometry.get_geometry(order).size
     puzzle = []
-    file = open(file_name)
-    valid_inputs = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
-    for ind in range(9):
-        line = file.readline()
-        row = line.split()
-        puzzle.append(row)
+    valid_inputs = [str(num) for num in range(size + 1)]
+    with open(file_name) as file:
+        for ind in range(size):
+            line = file.readline()
+            row = line.split()
+            puzzle.append(row)
     #  convert each value in puzzle from a string to an integer
     for row in range(len(puzzle)):
         for col in range(len(puzzle[row])):
             val_str = puzzle[row][col]
             if val_str not in valid_inputs:
-                raise ValueError("Input must be an integer from 0 to 9")
+                raise ValueError("Input must be an integer from 0 to " + str(size))
             puzzle[row][col] = int(val_str)
 
     return puzzle
@@ -500,7 +506,7 @@ def convert_1D_array(puzzle, assignment, is_solvable):
                 else:  # this is an assigned var
                     solution.append(val)
     else:  # the backtracking algorithm failed to solve the puzzle
-        solution = [-1] * 81
+        solution = [-1] * len(puzzle) ** 2
     return solution
 
 
@@ -511,97 +517,9 @@ def print_puzzle(puzzle):
         print()
 
 
-def parse_rows(puzzle):
-    rows = {}
-    for row in range(len(puzzle)):
-        rows[row] = [puzzle[row][col] for col in range(len(puzzle[row])) if puzzle[row][col] != 0]
-    return rows
-
-
-def parse_cols(puzzle):
-    cols = {}
-    for col in range(len(puzzle)):
-        cols[col] = [puzzle[row][col] for row in range(len(puzzle[col])) if puzzle[row][col] != 0]
-    return cols
-
-
-def parse_blocks(puzzle):
-    blocks = {0: [], 1: [], 2: [], 3: [], 4: [], 5: [], 6: [], 7: [], 8: []}
-    for row in range(len(puzzle)):
-        for col in range(len(puzzle[row])):
-            value = puzzle[row][col]
-            if value != 0:
-                block_num = None
-                if 0 <= row <= 2:
-                    if 0 <= col <= 2:
-                        block_num = 0
-                    elif 3 <= col <= 5:
-                        block_num = 1
-                    elif 6 <= col <= 8:
-                        block_num = 2
-                elif 3 <= row <= 5:
-                    if 0 <= col <= 2:
-                        block_num = 3
-                    elif 3 <= col <= 5:
-                        block_num = 4
-                    elif 6 <= col <= 8:
-                        block_num = 5
-                else:
-                    if 0 <= col <= 2:
-                        block_num = 6
-                    elif 3 <= col <= 5:
-                        block_num = 7
-                    elif 6 <= col <= 8:
-                        block_num = 8
-                blocks[block_num].append(value)
-    return blocks
-
-
-def given_enough_clues(puzzle):
-    num_clues = 0
-    for row in range(len(puzzle)):
-        for col in range(len(puzzle[row])):
-            value = puzzle[row][col]
-            if value != 0:
-                num_clues += 1
-    if 0 <= num_clues <= 16:
-        return False
-    return True
-
-
-def is_viable(puzzle):
-    if not given_enough_clues(puzzle):  # check if there are enough clues given for the algo to solve
-        return False
-    rows = parse_rows(puzzle)
-    cols = parse_cols(puzzle)
-    blocks = parse_blocks(puzzle)
-
-    # check every unit to make sure there are no invalid inputs
-    for row_ind in rows.keys():
-        row = rows[row_ind]
-        row.sort()
-        for ind in range(len(row) - 1):
-            curr_val = row[ind]
-            next_val = row[ind + 1]
-            if curr_val == next_val:
-                return False
-    for col_ind in cols.keys():
-        col = cols[col_ind]
-        col.sort()
-        for ind in range(len(col) - 1):
-            curr_val = col[ind]
-            next_val = col[ind + 1]
-            if curr_val == next_val:
-                return False
-    for block_ind in blocks.keys():
-        block = blocks[block_ind]
-        block.sort()
-        for ind in range(len(block) - 1):
-            curr_val = block[ind]
-            next_val = block[ind + 1]
-            if curr_val == next_val:
-                return False
-    return True
+def is_viable(puzzle):  # at least 17 clues (9x9) and no digit repeated in a row, column or block. Same check as the
+    # engines use (bitmask_solver.is_viable); validation.validate_batch checks many boards at once
+    return bitmask_solver.is_viable(bitmask_solver.flatten(puzzle))
 
 
 # def backtrack(csp, assignment):  # basic version (no forward checking)
@@ -630,49 +548,73 @@ def is_viable(puzzle):
 #     return False, assignment  # if none of the domain values are consistent with the past variable assignments
 #
 
-def revise(csp, var1, var2):
-    revised = False
-    for var1_val in var1.get_domain():
-        is_satisfied = False
-        for var2_val in var2.get_domain():
-            if var2_val != var1_val:
-                is_satisfied = True
-        if not is_satisfied:  # no value in var2's domain satisfies the constraint between var1 and var2
-            # given var1 = var1_val
-            # delete var1_val from var 1's domain
-            var1.prune_domain(var1_val)
-            revised = True
-    return revised
+def revise(csp, var1, var2):  # makes the arc var1 -> var2 consistent, returns True if var1's domain changed
+    # For a "not equal" constraint, a value of var1 only loses its support when var2's domain is exactly that value
+    if var2.get_domain_size() != 1:
+        return False
+    var2_val = var2.get_domain()[0]
+    if var2_val in var1.get_domain():
+        var1.prune_domain(var2_val)
+        return True
+    return False
 
 
 def ac_3(csp):  # Preprocessing arc-consistency algorithm to see if every arc is arc-consistent
     # or if some variables have empty domains
-    # Create a Queue object that will initially store all the arcs in csp
-    arc_container = queue.Queue()
-    constraints = csp.get_constraint_collection()
-    for constraint_ind in range(len(constraints)):
-        arc_container.put(constraints.get_collection()[constraint_ind])  # queues up the container with all the
-        # constraints in csp
-
-    while not arc_container.empty():
-        removed_arc = arc_container.get()  # pops first constraint out of the queue
-        constraint_vars = removed_arc.get_variables()
-        var1 = constraint_vars[0]
-        var2 = constraint_vars[1]
-        if revise(csp, var1, var2):
-            if len(var1.get_domain()) == 0:
-                return False
-            var_constraints = csp.get_constraint_collection().find_var_constraints(var1)
-            for ind in range(len(var_constraints)):
-                arc_container.put(var_constraints[ind])
-    return True
-
-
-def backtrack(csp, assignment):
-    curr_time = time.perf_counter()
-    if curr_time >= 120:
-        print("Program took too long to run")
-        sys.exit()  # scrap the program if the algorithm takes more than 2 minutes to run
+    # Returns (is_arc_consistent, number of values pruned, number of arcs processed)
+    # Arcs are directional (cell, peer) pairs between unassigned variables. The worklist is a deque plus a set of
+    # the arcs currently in it, so an arc is never queued twice
+    start = time.perf_counter()
+    is_arc_consistent, num_pruned, num_arcs = run_ac_3(csp)
+    if csp.stats is not None:
+        csp.stats.pruned += num_pruned
+        csp.stats.arcs += num_arcs
+        csp.stats.add_time("ac_3", time.perf_counter() - start)
+    return is_arc_consistent, num_pruned, num_arcs
+
+
+def run_ac_3(csp):
+    cells = csp.cells
+    unassigned_peers = {}
+    for var in csp.unassigned_vars:
+        if var.get_domain_size() == 0:  # emptied before AC-3 ran (by eliminate_domain_values), no arc would catch it
+            return False, 0, 0
+        var_ind = var.get_index()
+        unassigned_peers[var_ind] = [peer_ind for peer_ind in csp.geo.peers[var_ind]
+                                     if cells[peer_ind].get_value() == 0]
+
+    arc_container = deque()
+    queued = set()
+    for var_ind in unassigned_peers:  # queues up the container with every arc in csp
+        for peer_ind in unassigned_peers[var_ind]:
+            arc_container.append((var_ind, peer_ind))
+            queued.add((var_ind, peer_ind))
+
+    num_pruned = 0
+    num_arcs = 0
+    while arc_container:
+        arc = arc_container.popleft()
+        queued.discard(arc)
+        num_arcs += 1
+        var1 = cells[arc[0]]
+        if revise(csp, var1, cells[arc[1]]):
+            num_pruned += 1
+            if var1.get_domain_size() == 0:
+                return False, num_pruned, num_arcs
+            for peer_ind in unassigned_peers[arc[0]]:  # every arc pointing into var1 has to be checked again
+                incoming = (peer_ind, arc[0])
+                if peer_ind != arc[1] and incoming not in queued:
+                    arc_container.append(incoming)
+                    queued.add(incoming)
+    return True, num_pruned, num_arcs
+
+
+def backtrack(csp, assignment):  # recursive search, run by backtracking_search(iterative=False). IterativeSearch
+    # below is the same search without recursion
+    if csp.deadline is not None and time.perf_counter() >= csp.deadline:
+        raise SolveTimeout()  # scrap the search if it runs past its time limit (measured from the start of the search)
+    if csp.stats is not None:
+        csp.stats.nodes += 1
     if len(assignment) == len(csp):  # checks if the assignment is complete
         return True, assignment
     var = csp.select_unassigned_var()
@@ -691,35 +633,174 @@ def backtrack(csp, assignment):
             # print(inferences)
             # print()
             if inferences[0]:  # checks if the forward checking inference failed or not
+                mark = csp.state.mark()  # trail position to undo back to
                 csp.apply_inferences(inferences[1])  # apply the forward checking inferences to CSP
-                result = backtrack(csp, assignment)  # recursively calls backtracking algorithm with new assignment
-                if result[0]:  # if the recursive call is successful/true,
-                    # then the result will be sent back up in the recursive calls
-                    return result
-                csp.reverse_inferences(inferences[1])  # the inferences failed and need to be removed from CSP
+                # with propagate="node" the singles / pairs / pointing propagation runs after every assignment
+                if csp.propagation != propagation.EVERY_NODE or csp.propagate():
+                    result = backtrack(csp, assignment)  # recursively calls backtracking algorithm with new assignment
+                    if result[0]:  # if the recursive call is successful/true,
+                        # then the result will be sent back up in the recursive calls
+                        return result
+                csp.state.undo(mark)  # the inferences failed and are popped off the trail
             assignment.remove_assignment(var)  # if the recursive call fails, then the var is removed
             # from the assignment obj
             var.update_value(0)  # the variable is reset back to 0
             csp.add_unassigned_var(var)  # the variable is added back to the list of unassigned variables
+    if csp.stats is not None:
+        csp.stats.backtracks += 1
     return False, assignment  # if none of the domain values are consistent with the past variable assignments
 
 
-def backtracking_search(csp):
-    assignment = Assignment([])
-    return backtrack(csp, assignment)
-
-
-def main():
-    # Get the input file from the cmd command
-    parser = argparse.ArgumentParser(description='Solve Sudoku Puzzle with Backtracking Algorithm '
-                                                 'with MRV/degree heuristics and RGB order')
-    parser.add_argument('filename', help='The input file containing the initial and goal state')
-    cmdline = parser.parse_args()
-    file_name = cmdline.filename
-
-    # Parses the file and creates a 2D array that stores each cell as an int value and handles error inputs
-    sudoku_puzzle = file_reader(file_name)
-
+class IterativeSearch:
+    # Explicit-stack version of backtrack: the same MRV / degree buckets, forward checking and optional propagation,
+    # but every level of the search is a slot in three preallocated arrays (the cell, the values it has left to try
+    # and the trail position to undo to), so no frames, result tuples or inference dicts are created per node and
+    # the memory used is fixed once the search is built. run() can stop after a number of nodes and be called again
+    # to carry on, so a long solve can be paused, checkpointed (board()) or report its progress in between.
+    # With max_count > 1 the search keeps going after a solution and counts them, stopping at max_count
+    def __init__(self, csp, time_limit=None, max_count=1):
+        self.csp = csp
+        size = len(csp.unassigned_vars) + 1
+        self.cells = array('h', [-1] * size)  # cell assigned at every depth
+        self.untried = array(csp.state.domains.typecode, [0] * size)  # domain mask of the values not tried yet at
+        # every depth
+        self.marks = array('L', [0] * size)  # trail position at every depth, before its value was tried
+        self.depth = -1  # deepest level on the stack, -1 before the first node
+        self.descend = True  # the next step enters a new node below depth, instead of trying depth's next value
+        self.max_count = max_count
+        self.found = 0  # solutions found so far
+        self.solution = None  # flat list of the values of the first solution
+        self.finished = False
+        self.nodes = 0
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    def run(self, max_nodes=None):  # searches until it is finished (returns True) or until max_nodes more nodes have
+        # been entered (returns False, call run again to resume). Raises SolveTimeout once the time limit has passed;
+        # the search is left in a state it can resume from
+        if self.finished:
+            return True
+        state = self.csp.state
+        domains = state.domains
+        values = state.values
+        peers, digit_of = self.csp.geo.peers, self.csp.geo.digit_of
+        cells, untried, marks = self.cells, self.untried, self.marks
+        stats = self.csp.stats
+        propagate_nodes = self.csp.propagation == propagation.EVERY_NODE
+        stop = self.nodes + max_nodes if max_nodes is not None else None
+        depth = self.depth
+        descend = self.descend
+        try:
+            while True:
+                if descend:  # enter a new node: pick the next variable
+                    if stop is not None and self.nodes >= stop:
+                        return False
+                    if self.deadline is not None and self.nodes % CHECK_INTERVAL == 0 and \
+                            time.perf_counter() >= self.deadline:
+                        raise SolveTimeout()
+                    self.nodes += 1
+                    if stats is not None:
+                        stats.nodes += 1
+                    cell = state.select()
+                    if cell is None:  # every variable is assigned
+                        self.found += 1
+                        if self.solution is None:
+                            self.solution = list(values)
+                        if self.found >= self.max_count or depth < 0:
+                            self.finished = True
+                            return True
+                        descend = False  # counting: carry on with the next value of the deepest variable
+                        continue
+                    depth += 1
+                    state.dequeue(cell)
+                    cells[depth] = cell
+                    untried[depth] = domains[cell]
+                    marks[depth] = len(state.trail)
+                    descend = False
+
+                cell = cells[depth]  # try the next value of the variable at depth
+                state.undo(marks[depth])  # drops the pruning of the value tried before
+                remaining = untried[depth]
+                if remaining == 0:  # every value failed, backtrack to the level above
+                    values[cell] = 0
+                    state.enqueue(cell)
+                    if stats is not None:
+                        stats.backtracks += 1
+                    depth -= 1
+                    if depth < 0:
+                        self.finished = True
+                        return True
+                    continue
+                bit = remaining & -remaining
+                untried[depth] = remaining ^ bit
+                values[cell] = digit_of[bit]
+                descend = True
+                for peer in peers[cell]:  # forward checking, straight on the domain masks
+                    if values[peer] == 0 and domains[peer] & bit:
+                        if domains[peer] == bit:  # would wipe out the peer's domain
+                            descend = False
+                            break
+                        state.set_mask(peer, domains[peer] ^ bit)
+                        if stats is not None:
+                            stats.pruned += 1
+                if descend and propagate_nodes:
+                    descend = self.csp.propagate()
+        finally:
+            self.depth = depth
+            self.descend = descend
+
+    def progress(self):  # number of variables currently assigned by the search
+        return self.depth + 1
+
+    def board(self):  # the current (partial) board as a flat list of values, 0 for the unassigned cells
+        return list(self.csp.state.values)
+
+
+def count_solutions(sudoku_puzzle, limit=2, time_limit=120, stats=None, propagate=propagation.ROOT):  # counts
+    # the solutions of a puzzle with AC-3, propagation and the counting search, stopping once limit are found.
+    # 0 if a digit is repeated in a unit or the puzzle has no solution. Like the other engines it counts puzzles with
+    # too few clues to be viable, callers that want those rejected check is_viable first. Raises SolveTimeout if the
+    # search takes more than time_limit seconds
+    if bitmask_solver.build_masks(bitmask_solver.flatten(sudoku_puzzle)) is None:
+        return 0
+    csp = CSP(sudoku_puzzle, stats, propagate)
+    csp.eliminate_domain_values()
+    if not ac_3(csp)[0]:
+        return 0
+    if propagate != propagation.OFF and not csp.propagate():
+        return 0
+    start = time.perf_counter()
+    search = IterativeSearch(csp, time_limit, limit)
+    try:
+        search.run()
+    finally:
+        if stats is not None:
+            stats.add_time("search", time.perf_counter() - start)
+    return search.found
+
+
+def backtracking_search(csp, time_limit=120, iterative=True):  # raises SolveTimeout if the search takes more than
+    # time_limit seconds (unless the CSP was built with propagate="off", propagation first narrows the domains at the
+    # root). Runs IterativeSearch, or the recursive backtrack with iterative=False
+    assignment = Assignment([], csp.geo.cells)
+    if csp.propagation != propagation.OFF and not csp.propagate():  # propagation alone showed there is no solution
+        return False, assignment
+    start = time.perf_counter()
+    try:
+        if iterative:
+            search = IterativeSearch(csp, time_limit)
+            search.run()
+            if search.found:  # the values are in the domain state, which the variables read theirs from
+                assignment = Assignment(list(csp.unassigned_vars), csp.geo.cells)
+            return search.found > 0, assignment
+        csp.deadline = start + time_limit if time_limit is not None else None
+        return backtrack(csp, assignment)
+    finally:
+        if csp.stats is not None:
+            csp.stats.add_time("search", time.perf_counter() - start)
+
+
+def solve_puzzle(sudoku_puzzle, propagate=propagation.ROOT):  # solves one puzzle and prints it, its solution
+    # and the search statistics
     # Outputs the sudoku problem (before it is solved) to the terminal
     print("Input: ")
     print_puzzle(sudoku_puzzle)
@@ -744,15 +825,22 @@ def main():
     # print(output)
     start = time.perf_counter()  # start the timer
 
+    stats = SearchStats()
     if is_viable(sudoku_puzzle):
-        csp = CSP(sudoku_puzzle)
+        csp = CSP(sudoku_puzzle, stats, propagate)
         csp.eliminate_domain_values()
-        is_arc_consistent = ac_3(csp)
+        is_arc_consistent, num_pruned, num_arcs = ac_3(csp)
+        print("AC-3 pruned", num_pruned, "values in", num_arcs, "arcs")
         if is_arc_consistent:
-            solution = backtracking_search(csp)
+            try:
+                solution = backtracking_search(csp)  # gives up after 2 minutes
+            except SolveTimeout:
+                solution = None, None
             is_success = solution[0]
 
-            if is_success:  # checks if the puzzle was solvable
+            if is_success is None:
+                print("Program took too long to run")
+            elif is_success:  # checks if the puzzle was solvable
                 assignment = solution[1]
                 # write_output_file(file_name, sudoku_puzzle, assignment)  # writes the output file with the solved
                 # puzzle
@@ -767,6 +855,48 @@ def main():
     end = time.perf_counter()  # end the timer
     diff_time = end - start  # take the difference in time
     print("Time to run algorithm: ", diff_time)
+    print("Search nodes:", stats.nodes, " backtracks:", stats.backtracks, " values pruned:", stats.pruned)
+    for phase, seconds in sorted(stats.phase_times.items()):
+        print("  " + phase + ":", seconds)
+
+
+def count_puzzle(sudoku_puzzle, propagate=propagation.ROOT):  # prints whether a puzzle has no, one or several
+    # solutions
+    start = time.perf_counter()
+    if not is_viable(sudoku_puzzle):
+        print("Failure. Puzzle is not viable.")
+        return
+    try:
+        count = count_solutions(sudoku_puzzle, propagate=propagate)
+    except SolveTimeout:
+        print("Program took too long to run")
+        return
+    print({0: "No solution", 1: "Unique solution"}.get(count, "Multiple solutions"))
+    print("Time to run algorithm: ", time.perf_counter() - start)
+
+
+def main():
+    # Get the input file from the cmd command
+    parser = argparse.ArgumentParser(description='Solve Sudoku Puzzle with Backtracking Algorithm '
+                                                 'with MRV/degree heuristics and RGB order')
+    parser.add_argument('filename', help='The input file: 9-line grids, 81 character lines (0 or . for blanks) '
+                                         'or puzzle,solution csv, any number of puzzles. - reads stdin')
+    parser.add_argument('--count', action='store_true',
+                        help='Count solutions (stopping at two) to check each puzzle is unique instead of solving it')
+    parser.add_argument('--propagate', choices=propagation.LEVELS, default=propagation.ROOT,
+                        help='Run singles / pairs / pointing propagation before the search (root), after every '
+                             'assignment (node) or not at all (off)')
+    parser.add_argument('--order', type=int, choices=geometry.ORDERS, default=geometry.DEFAULT_ORDER,
+                        help='Board order: 3 for 9x9 puzzles (default), 4 for 16x16, 5 for 25x25')
+    cmdline = parser.parse_args()
+    file_name = cmdline.filename
+
+    # Puzzles are read one at a time (puzzle_io), so the input file can be any size
+    for puzzle, solution in puzzle_io.read_puzzles(file_name, order=cmdline.order):
+        if cmdline.count:
+            count_puzzle(puzzle_io.to_grid(puzzle), cmdline.propagate)
+        else:
+            solve_puzzle(puzzle_io.to_grid(puzzle), cmdline.propagate)
 
 
 if __name__ == "__main__":
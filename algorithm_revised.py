@@ -5,6 +5,11 @@
 import time
 import numpy as np
 import argparse
+import bitmask_solver
+import geometry
+import puzzle_io
+import solvers
+import validation
 
 
 def shape_puzzles(collection):
@@ -14,36 +19,17 @@ def shape_puzzles(collection):
     return collection
 
 
-def checkPuzzle(sudoku_puzzle):
-    checkRow = all([all([x in sudoku_puzzle[nrow, :] for x in range(1, 10)]) for nrow in range(9)])
-    checkCol = all([all([x in sudoku_puzzle[:, ncol] for x in range(1, 10)]) for ncol in range(9)])
-
-    checkUpperLeft = all([x in sudoku_puzzle[0:3, 0:3] for x in range(1, 10)])
-    checkUpperMid = all([x in sudoku_puzzle[0:3, 3:6] for x in range(1, 10)])
-    checkUpperRight = all([x in sudoku_puzzle[0:3, 6:9] for x in range(1, 10)])
-
-    checkMidLeft = all([x in sudoku_puzzle[3:6, 0:3] for x in range(1, 10)])
-    checkMidMid = all([x in sudoku_puzzle[3:6, 3:6] for x in range(1, 10)])
-    checkMidRight = all([x in sudoku_puzzle[3:6, 6:9] for x in range(1, 10)])
-
-    checkLowerLeft = all([x in sudoku_puzzle[6:9, 0:3] for x in range(1, 10)])
-    checkLowerMid = all([x in sudoku_puzzle[6:9, 3:6] for x in range(1, 10)])
-    checkLowerRight = all([x in sudoku_puzzle[6:9, 6:9] for x in range(1, 10)])
-
-    solved = all([checkRow, checkCol, checkUpperLeft, checkUpperMid, checkUpperRight,
-                  checkMidLeft, checkMidMid, checkMidRight, checkLowerLeft, checkLowerMid, checkLowerRight])
-    # if solved:
-    #     for line in sudoku_puzzle:
-    #         print(*line)
-    return solved
+def checkPuzzle(sudoku_puzzle):  # True if every row, column and block holds each digit exactly once
+    return bool(validation.is_complete([sudoku_puzzle])[0])
 
 
 def determineValues(sudoku_puzzle):
     puzzle_values = list()
-    for r in range(9):
-        for c in range(9):
+    size = len(sudoku_puzzle)
+    for r in range(size):
+        for c in range(size):
             if sudoku_puzzle[r, c] == 0:
-                cell_values = np.array(range(1, 10))
+                cell_values = np.array(range(1, size + 1))
                 cell_values = np.setdiff1d(cell_values,
                                            sudoku_puzzle[r, :][np.where(sudoku_puzzle[r, :] != 0)]).tolist()
                 cell_values = np.setdiff1d(cell_values,
@@ -54,29 +40,11 @@ def determineValues(sudoku_puzzle):
     return puzzle_values
 
 
-def checkGrids(r, c, sudoku_puzzle, n):
-    if r < 3:
-        if c < 3:
-            subgrid = n in sudoku_puzzle[0:3, 0:3]
-        elif c < 6:
-            subgrid = n in sudoku_puzzle[0:3, 3:6]
-        else:
-            subgrid = n in sudoku_puzzle[0:3, 6:9]
-    elif r < 6:
-        if c < 3:
-            subgrid = n in sudoku_puzzle[3:6, 0:3]
-        elif c < 6:
-            subgrid = n in sudoku_puzzle[3:6, 3:6]
-        else:
-            subgrid = n in sudoku_puzzle[3:6, 6:9]
-    else:
-        if c < 3:
-            subgrid = n in sudoku_puzzle[6:9, 0:3]
-        elif c < 6:
-            subgrid = n in sudoku_puzzle[6:9, 3:6]
-        else:
-            subgrid = n in sudoku_puzzle[6:9, 6:9]
-    return subgrid
+def checkGrids(r, c, sudoku_puzzle, n):  # True if n is already in the block of cell (r, c)
+    order = geometry.order_of(sudoku_puzzle.size)
+    top = r - r % order
+    left = c - c % order
+    return n in sudoku_puzzle[top:top + order, left:left + order]
 
 
 def convert_2_1D_list(output_arr):
@@ -87,106 +55,31 @@ def convert_2_1D_list(output_arr):
     return output
 
 
-def parse_rows(puzzle):
-    rows = {}
-    for row in range(len(puzzle)):
-        rows[row] = [puzzle[row][col] for col in range(len(puzzle[row])) if puzzle[row][col] != 0]
-    return rows
-
-
-def parse_cols(puzzle):
-    cols = {}
-    for col in range(len(puzzle)):
-        cols[col] = [puzzle[row][col] for row in range(len(puzzle[col])) if puzzle[row][col] != 0]
-    return cols
+def is_viable(puzzle):  # at least 17 clues and no digit repeated in a row, column or block. Same check as the
+    # engines use (bitmask_solver.is_viable); validation.validate_batch checks many boards at once
+    return bitmask_solver.is_viable(bitmask_solver.flatten(puzzle))
 
 
-def parse_blocks(puzzle):
-    blocks = {0: [], 1: [], 2: [], 3: [], 4: [], 5: [], 6: [], 7: [], 8: []}
-    for row in range(len(puzzle)):
-        for col in range(len(puzzle[row])):
-            value = puzzle[row][col]
-            if value != 0:
-                block_num = None
-                if 0 <= row <= 2:
-                    if 0 <= col <= 2:
-                        block_num = 0
-                    elif 3 <= col <= 5:
-                        block_num = 1
-                    elif 6 <= col <= 8:
-                        block_num = 2
-                elif 3 <= row <= 5:
-                    if 0 <= col <= 2:
-                        block_num = 3
-                    elif 3 <= col <= 5:
-                        block_num = 4
-                    elif 6 <= col <= 8:
-                        block_num = 5
-                else:
-                    if 0 <= col <= 2:
-                        block_num = 6
-                    elif 3 <= col <= 5:
-                        block_num = 7
-                    elif 6 <= col <= 8:
-                        block_num = 8
-                blocks[block_num].append(value)
-    return blocks
+def solve(input_arr, time_limit=None, stats=None):
+    # Runs the bitmask engine (bitmask_solver.py): row/column/block occupancy masks make every placement and undo
+    # O(1) instead of rebuilding numPy arrays for each trial value. Same input and output as solve_numpy below,
+    # plus [-3] * 81 if time_limit (seconds) is given and runs out. stats (bitmask_solver.SearchStats) is optional
+    return bitmask_solver.solve(input_arr, time_limit, stats)
 
 
-def given_enough_clues(puzzle):
-    num_clues = 0
-    for row in range(len(puzzle)):
-        for col in range(len(puzzle[row])):
-            value = puzzle[row][col]
-            if value != 0:
-                num_clues += 1
-    if 0 <= num_clues <= 16:
-        return False
-    return True
+def check_uniqueness(input_arr, time_limit=None, stats=None):  # counts the solutions of the puzzle with the
+    # bitmask engine, stopping at two: "unique", "multiple", "none", "invalid" or "timeout" (see solvers.py)
+    return solvers.check_uniqueness(input_arr, "bitmask", time_limit, stats)
 
 
-def is_viable(puzzle):
-    if not given_enough_clues(puzzle):  # check if there are enough clues given for the algo to solve
-        return False
-    rows = parse_rows(puzzle)
-    cols = parse_cols(puzzle)
-    blocks = parse_blocks(puzzle)
-
-    # check every unit to make sure there are no invalid inputs
-    for row_ind in rows.keys():
-        row = rows[row_ind]
-        row.sort()
-        for ind in range(len(row) - 1):
-            curr_val = row[ind]
-            next_val = row[ind + 1]
-            if curr_val == next_val:
-                return False
-    for col_ind in cols.keys():
-        col = cols[col_ind]
-        col.sort()
-        for ind in range(len(col) - 1):
-            curr_val = col[ind]
-            next_val = col[ind + 1]
-            if curr_val == next_val:
-                return False
-    for block_ind in blocks.keys():
-        block = blocks[block_ind]
-        block.sort()
-        for ind in range(len(block) - 1):
-            curr_val = block[ind]
-            next_val = block[ind + 1]
-            if curr_val == next_val:
-                return False
-    return True
-
-
-def solve(input_arr):
+def solve_numpy(input_arr):  # original cell-by-cell numPy implementation, kept around for runtime comparisons
     # Added a section that checks if the given puzzle is even viable (before solving) -
     # saves time by not solving puzzles we know will be invalid based on given clues
     if not is_viable(input_arr):
-        output = [-2] * 81
+        output = bitmask_solver.failed(bitmask_solver.flatten(input_arr), -2)
         return output
-    sudoku_puzzle = np.empty((0, 9), int)  # set the sudoku puzzle to be an empty row that can be
+    size = len(input_arr)
+    sudoku_puzzle = np.empty((0, size), int)  # set the sudoku puzzle to be an empty row that can be
     # added onto using numPy append method
     for row_ind in range(len(input_arr)):  # adds rows to numPy array from input array
         row_values = input_arr[row_ind]
@@ -207,10 +100,10 @@ def solve(input_arr):
                 break
             r = rows[count]
             c = cols[count]
-            len_num = len(np.array(puzzle_values).reshape(9, 9)[r, c])
+            len_num = len(puzzle_values[r * size + c])
             num = dic[count]
             while num < len_num:
-                cell = np.array(puzzle_values).reshape(9, 9)[r, c][num]
+                cell = puzzle_values[r * size + c][num]
                 checkRow = cell in sudoku_puzzle[r, :]
                 if checkRow:
                     num += 1
@@ -237,7 +130,7 @@ def solve(input_arr):
             output = convert_2_1D_list(sudoku_puzzle)
             return output
     except KeyError:
-        output = [-1] * 81
+        output = [-1] * size * size
         return output  # returns 1D array of values for the website to process (in app.py)
 
 
@@ -259,20 +152,22 @@ def solve(input_arr):
 #     input_array = np.array([puzzle[0], puzzle[1], puzzle[2], puzzle[3], puzzle[4], puzzle[5], puzzle[6], puzzle[7], puzzle[8]])
 #     return input_array
 
-def file_reader(file_name):
+def file_reader(file_name, order=geometry.DEFAULT_ORDER):  # reads a single grid of size lines of size numbers
+    # (9-line grid by default), see puzzle_io.read_puzzles for files of many puzzles
+    size = geometry.get_geometry(order).size
     puzzle = []
-    file = open(file_name)
-    valid_inputs = ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
-    for ind in range(9):
-        line = file.readline()
-        row = line.split()
-        puzzle.append(row)
+    valid_inputs = [str(num) for num in range(size + 1)]
+    with open(file_name) as file:
+        for ind in range(size):
+            line = file.readline()
+            row = line.split()
+            puzzle.append(row)
     #  convert each value in puzzle from a string to an integer
     for row in range(len(puzzle)):
         for col in range(len(puzzle[row])):
             val_str = puzzle[row][col]
             if val_str not in valid_inputs:
-                raise ValueError("Input must be an integer from 0 to 9")
+                raise ValueError("Input must be an integer from 0 to " + str(size))
             puzzle[row][col] = int(val_str)
 
     return puzzle
@@ -282,7 +177,12 @@ def main():
     # Get the input file from the cmd command
     parser = argparse.ArgumentParser(description='Solve Sudoku Puzzle with Backtracking Algorithm '
                                                  'with MRV/degree heuristics and RGB order')
-    parser.add_argument('filename', help='The input file containing the initial and goal state')
+    parser.add_argument('filename', help='The input file: 9-line grids, 81 character lines (0 or . for blanks) '
+                                         'or puzzle,solution csv, any number of puzzles. - reads stdin')
+    parser.add_argument('--count', action='store_true',
+                        help='Report whether each puzzle has a unique solution instead of solving it')
+    parser.add_argument('--order', type=int, choices=geometry.ORDERS, default=geometry.DEFAULT_ORDER,
+                        help='Board order: 3 for 9x9 puzzles (default), 4 for 16x16, 5 for 25x25')
     cmdline = parser.parse_args()
     file_name = cmdline.filename
 
@@ -294,13 +194,17 @@ def main():
     #                           [0, 0, 8, 1, 0, 5, 0, 3, 0], [4, 0, 0, 0, 9, 0, 0, 0, 7], [0, 1, 0, 3, 0, 4, 5, 0, 0],
     #                           [6, 0, 0, 7, 3, 8, 0, 1, 0], [0, 0, 1, 0, 0, 0, 2, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0, 3]])
     # sudoku_puzzle = file_reader(file_name)
-    input_arr = file_reader(file_name)
     # sudoku_df = pd.DataFrame(pd.read_csv('sudoku.csv', nrows=100))  # imports first 100 puzzles and solutions
     # # for training/testing
     # shaped_puzzles = shape_puzzles(sudoku_df)
     start = time.perf_counter()
     # puzzle_vals = determineValues(sudoku_puzzle)
-    print(solve(input_arr))
+    # one puzzle at a time, in constant memory
+    for puzzle, solution in puzzle_io.read_puzzles(file_name, order=cmdline.order):
+        if cmdline.count:
+            print(puzzle, check_uniqueness(puzzle_io.to_grid(puzzle)))
+        else:
+            print(solve(puzzle_io.to_grid(puzzle)))
     end = time.perf_counter()
     total_time = end - start
     print("Runtime: ", total_time)
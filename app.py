@@ -1,17 +1,64 @@
 #Dev: Sean Balakhanei
 
-from flask import Flask, render_template, redirect, request, url_for
-import algorithm_revised, random
+from flask import Flask, render_template, redirect, request, url_for, jsonify, Response
+from itsdangerous import URLSafeSerializer, BadSignature
+import random, os
+import solvers
+import rating
+import validation
+from solution_cache import SolutionCache, board_key
+from solve_runner import SolveRunner
+from generator import PuzzlePool
+from metrics import SolveMetrics
 
 app = Flask(__name__)
-difficulty = []
+# Signs the difficulty label handed out with a generated board. Every server process has to use the same key, so
+# set SECRET_KEY in production (gunicorn.conf.py makes one up for its workers if it is missing)
+app.secret_key = os.environ.get("SECRET_KEY") or os.urandom(32)
+difficulty_signer = URLSafeSerializer(app.secret_key, salt="difficulty")
+# Search statistics of every solve, served by /metrics. Solves slower than SLOW_SOLVE_SECONDS are logged with their
+# board
+solve_metrics = SolveMetrics(slow_seconds=float(os.environ.get("SLOW_SOLVE_SECONDS", 1.0)))
+# Solves run in a bounded pool of worker processes and give up after SOLVE_TIME_LIMIT seconds. A whole
+# /api/solve/batch request gives up after BATCH_TIME_LIMIT seconds
+solve_runner = SolveRunner(max_workers=int(os.environ.get("SOLVE_WORKERS", 0)) or None,
+                           time_limit=float(os.environ.get("SOLVE_TIME_LIMIT", 10)), metrics=solve_metrics,
+                           batch_time_limit=float(os.environ.get("BATCH_TIME_LIMIT", 60)))
+# Solved boards are cached by their 81 character string. SOLUTION_CACHE_DB adds an on-disk SQLite layer.
+# Misses are retried under the board's canonical form, so symmetric copies of a board share one solve. The
+# canonical form is found in the worker pool
+solution_cache = SolutionCache(max_size=int(os.environ.get("SOLUTION_CACHE_SIZE", 10000)),
+                               db_path=os.environ.get("SOLUTION_CACHE_DB"), canonical_keys=True,
+                               canonicalize=solve_runner.canonicalize)
+# Largest number of boards accepted by one /api/solve/batch request
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 1000))
+# Result codes of the solvers and the status reported for them by the JSON API
+API_STATUS = {-1: "no_solution", -2: "invalid", -3: "timeout"}
+# Target numbers of clues for generated boards. Each target keeps a pool of PUZZLE_POOL_SIZE ready puzzles that a
+# background thread refills, so /generate_board never waits on the generator
+GENERATED_CLUES = [36, 30, 26, 22]
+puzzle_pools = [PuzzlePool(size=int(os.environ.get("PUZZLE_POOL_SIZE", 10)), target_clues=clues, attempts=3)
+                for clues in GENERATED_CLUES]
+# Seconds the rater may spend searching a board typed in by the user before calling it Expert
+RATING_TIME_LIMIT = float(os.environ.get("RATING_TIME_LIMIT", 0.5))
 @app.route("/")
 def index():
     return render_template("index.html")
 
+# Difficulty of a generated board travels with the form as a signed hidden field, [label, color, board key], so no
+# state is kept between requests and any server process can handle the /solve that follows a /generate_board.
+# Returns None if the form doesn't carry a valid one or the board was changed since it was generated
+def read_difficulty(form, key):
+    try:
+        difficulty = difficulty_signer.loads(form.get("difficulty", ""))
+    except BadSignature:
+        return None
+    if not isinstance(difficulty, list) or len(difficulty) != 3 or difficulty[2] != key:
+        return None
+    return difficulty[:2]
+
 @app.route("/solve", methods=["POST", "GET"])
 def get_input():
-    global difficulty
     # Creating matrix of spots algorithmically
     input = [[]]*9
     spots = [[]]*9
@@ -32,150 +79,168 @@ def get_input():
                 input[j][i] = 0
             input[j][i] = int(input[j][i])
 
-    solution = algorithm_revised.solve(input)
+    # Generated boards (the ones that carry a signed difficulty for this very board) are already rated and unique.
+    # A board typed in by the user may have more than one solution, which the page points out, and is rated
+    # (rating.py). Solving, checking and rating it is one worker job, SOLVE_TIME_LIMIT + RATING_TIME_LIMIT at most.
+    # Boards without a solution are rated N/A
+    difficulty = read_difficulty(request.form, board_key(input))
+    if difficulty is not None:
+        solution = solution_cache.solve(input, solve_runner.solve)
+        uniqueness = solvers.UNIQUE
+    else:
+        checked = []
+
+        def solve_checked(input_arr):
+            checked.extend(solve_runner.solve_checked(input_arr, RATING_TIME_LIMIT))
+            return checked[0]
 
-    # If the board is user input, we cannot determine the difficulty
-    if len(difficulty) == 0:
-        difficulty = ["N/A", "black"]
+        solution = solution_cache.solve(input, solve_checked)
+        if not checked:  # the solution was cached, the check and the rating still have to run
+            checked.extend(solve_runner.solve_checked(input, RATING_TIME_LIMIT, solution))
+        solution, uniqueness, difficulty = checked
 
     # If a solution exists, display it.
     # If the input puzzle is invalid, display Invalid Input
     # If there puzzle is valid, but there is no solution, display No Solution
+    # If the solver ran out of time, display Timed Out
     if solution[0] > 0:
-        x = difficulty
-        difficulty = []
-        return render_template("solve.html", solution=solution, difficulty=x)
+        return render_template("solve.html", solution=solution, difficulty=difficulty,
+                               multiple_solutions=uniqueness == solvers.MULTIPLE)
     else:
-        type = "No Solution"
-        x = difficulty
-        difficulty = []
-        return render_template("unsolvable.html", solution=[-1]*81, difficulty=x, type=type)
+        if solution[0] == -2:
+            type = "Invalid Input"
+        elif solution[0] == -3:
+            type = "Timed Out"
+        else:
+            type = "No Solution"
+        return render_template("unsolvable.html", solution=[-1]*81, difficulty=difficulty, type=type)
+
+# Converts a board sent to the JSON API into the 9x9 list the solvers take. Accepts an 81 character string
+# ('0' or '.' for blanks), a flat list of 81 integers 0 - 9 or a 9x9 list. Returns None if the board can't be read
+def parse_board(board):
+    if isinstance(board, str):
+        if len(board) != 81 or any(char not in "0123456789." for char in board):
+            return None
+        board = [0 if char == '.' else int(char) for char in board]
+    elif isinstance(board, list) and len(board) == 9 and all(isinstance(row, list) for row in board):
+        board = [value for row in board for value in row]
+    if not isinstance(board, list) or len(board) != 81:
+        return None
+    if any(isinstance(value, bool) or not isinstance(value, int) for value in board):  # 1.7 is not a 1, nor is true
+        return None
+    if any(value < 0 or value > 9 for value in board):
+        return None
+    return [board[row * 9: row * 9 + 9] for row in range(9)]
+
+# JSON result for one solved board: the solution as an 81 character string, or null with the reason in status
+def solution_json(solution):
+    if solution[0] > 0:
+        return {"status": "solved", "solution": "".join(str(value) for value in solution)}
+    return {"status": API_STATUS[solution[0]], "solution": None}
+
+# Reads the optional engine / time_limit fields shared by the API routes, raises ValueError on bad values
+def solve_options(data):
+    engine = data.get("engine", solvers.DEFAULT_ENGINE)
+    solvers.get_engine(engine)
+    time_limit = data.get("time_limit", solve_runner.time_limit)
+    if isinstance(time_limit, bool) or not isinstance(time_limit, (int, float)) or time_limit <= 0:
+        raise ValueError("time_limit must be a positive number of seconds")
+    return engine, min(time_limit, solve_runner.time_limit)
+
+# JSON API: {"board": <board>} in, {"status": ..., "solution": ...} out. Solving happens in the worker pool.
+# Invalid boards also get "conflicts", the names of the units that repeat a digit
+@app.route("/api/solve", methods=["POST"])
+def api_solve():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    board = parse_board(data.get("board"))
+    if board is None:
+        return jsonify({"error": "board must be an 81 character string or a list of 81 numbers"}), 400
+    try:
+        engine, time_limit = solve_options(data)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    solution = solution_cache.solve(board, lambda input_arr: solve_runner.solve(input_arr, time_limit, engine))
+    result = solution_json(solution)
+    if solution[0] == -2:  # say which rows / columns / blocks repeat a digit
+        result["conflicts"] = validation.conflict_names(board)
+    return jsonify(result)
+
+# JSON API for many boards at once: {"boards": [<board>, ...]} in, {"results": [...]} out in the same order.
+# Cached boards are answered directly and the rest are solved in parallel across the worker pool
+@app.route("/api/solve/batch", methods=["POST"])
+def api_solve_batch():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("boards"), list):
+        return jsonify({"error": "expected a JSON object with a list of boards"}), 400
+    if len(data["boards"]) > MAX_BATCH_SIZE:
+        return jsonify({"error": "at most " + str(MAX_BATCH_SIZE) + " boards per request"}), 400
+    boards = []
+    for pos, board in enumerate(data["boards"]):
+        board = parse_board(board)
+        if board is None:
+            return jsonify({"error": "board " + str(pos) +
+                            " must be an 81 character string or a list of 81 numbers"}), 400
+        boards.append(board)
+    try:
+        engine, time_limit = solve_options(data)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+
+    results = [solution_cache.get(board_key(board)) for board in boards]
+    missing = [pos for pos in range(len(boards)) if results[pos] is None]
+    solved = solve_runner.solve_many([boards[pos] for pos in missing], time_limit, engine)
+    for pos, solution in zip(missing, solved):
+        solution_cache.put(board_key(boards[pos]), solution)
+        results[pos] = solution
+    return jsonify({"results": [solution_json(solution) for solution in results]})
+
+# JSON API for uniqueness checks: {"board": <board>} in, {"uniqueness": ...} out, where uniqueness is "unique",
+# "multiple", "none" (no solution), "invalid" or "timeout". Solutions are only counted up to two, nothing is solved
+@app.route("/api/check", methods=["POST"])
+def api_check():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    board = parse_board(data.get("board"))
+    if board is None:
+        return jsonify({"error": "board must be an 81 character string or a list of 81 numbers"}), 400
+    try:
+        engine, time_limit = solve_options(data)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    return jsonify({"uniqueness": solve_runner.check(board, time_limit, engine)})
+
+# Hit/miss counters of the solution cache
+@app.route("/cache_stats")
+def cache_stats():
+    return jsonify(solution_cache.stats())
+
+# Prometheus metrics: solve counts by result, search nodes / backtracks, solver time by phase and cache counters
+@app.route("/metrics")
+def metrics():
+    cache = solution_cache.stats()
+    gauges = {"sudoku_cache_hits": ("Solution cache hits", cache["hits"]),
+              "sudoku_cache_misses": ("Solution cache misses", cache["misses"]),
+              "sudoku_cache_size": ("Boards in the solution cache", cache["size"]),
+              "sudoku_solve_abandoned": ("Solves given up on while waiting for a worker", solve_runner.timeouts)}
+    return Response(solve_metrics.render(gauges), mimetype="text/plain; version=0.0.4")
 
 # Back to home page when user wants to input a new puzzle
 def start_again():
-    global difficulty
-    difficulty = []
     return render_template("index.html")
 
 # Display a computer generated board to be solved
-# 25% of the time, the board will be generated randomly (odds are there will be no solution)
-# To make this function more practical, 75% of the time a solvable Sudoku puzzle will be displayed
-
-# Note: Given that generating solvable Sudoku puzzles is np complete, the solvable puzzles output by
-# the "Generate Puzzle" function will be manually selected from several pre-defined puzzles
+# The board comes from the generator (generator.py), so it always has exactly one solution, and its difficulty
+# label comes from the rater (rating.py). Its solution is stored in the solution cache right away, so solving it
+# unchanged doesn't run the solver again
 @app.route("/generate_board", methods=["POST"])
 def generate_board():
-    global difficulty
-    input = ['1']*81
-    num = random.randint(1, 4)
-    if num == 1:
-        # On average we're going to fill 3-4 boxes in each column with numbers 1-9
-        # There may be overlap if the same position is selected twice, but it's not a big deal
-        # Since the number of boxes is constant, O(1) time & space
-        difficulty = ["Random", "black"]
-        input = [0]*81
-        for i in range(32):
-            position = random.randint(0, 80)
-            num = random.randint(1, 9)
-            input[position] = num
-    else:
-        puzzle_number = random.randint(1, 8)
-        if puzzle_number == 1:
-            # Self-made puzzle (equivalent of Medium difficulty)
-            difficulty = ["Medium", "orange"]
-            input =[0,0,0,5,6,0,7,0,4,
-                    6,8,0,0,7,0,0,9,0,
-                    4,9,0,0,0,1,2,0,0,
-                    8,5,0,4,0,0,0,1,0,
-                    0,0,1,6,0,5,9,0,0,
-                    0,2,0,0,0,3,0,5,8,
-                    0,0,9,3,0,0,0,7,1,
-                    0,1,0,0,2,0,0,3,6,
-                    7,0,3,0,4,8,0,0,0]
-        elif puzzle_number == 2:
-            # Easy puzzle from Sudoku.com
-            difficulty = ["Easy", "green"]
-            input = [0,3,4,7,0,6,0,0,0,
-                     0,0,0,0,5,0,2,0,0,
-                     7,5,0,0,0,0,0,0,4,
-                     9,7,0,2,6,1,0,4,8,
-                     3,8,2,0,4,7,0,5,1,
-                     0,0,6,0,0,0,0,9,2,
-                     0,0,3,0,0,0,0,0,7,
-                     8,0,0,5,0,2,4,0,0,
-                     0,0,0,0,7,9,8,0,6]
-        elif puzzle_number == 3:
-            # Medium puzzle from Sudoku.com
-            difficulty = ["Medium", "orange"]
-            input = [7,0,8,0,0,1,4,0,0,
-                     3,0,0,4,0,0,0,0,0,
-                     0,9,4,5,0,0,0,7,6,
-                     2,7,0,6,0,8,0,0,0,
-                     6,0,3,0,0,0,7,0,2,
-                     0,0,0,7,0,0,1,6,0,
-                     0,0,0,0,5,4,0,0,1,
-                     4,1,5,0,0,0,8,2,7,
-                     0,0,0,0,0,0,0,0,4]
-        elif puzzle_number == 4:
-            # Hard puzzle from Sudoku.com
-            difficulty = ["Hard", "red"]
-            input = [0,9,0,0,0,0,0,6,0,
-                     0,0,7,0,1,5,0,4,0,
-                     0,0,4,6,0,3,1,0,0,
-                     0,0,0,0,0,0,0,2,0,
-                     9,0,0,0,5,0,0,0,3,
-                     0,7,6,0,0,0,0,5,0,
-                     0,0,0,0,3,2,6,0,0,
-                     0,1,0,5,0,0,0,3,0,
-                     0,5,0,7,0,4,2,0,9]
-        elif puzzle_number == 5:
-            # Expert puzzle from Sudoku.com
-            difficulty = ["Expert", "purple"]
-            input = [0,3,0,1,0,0,4,0,0,
-                     0,0,6,0,0,0,0,5,3,
-                     0,0,0,0,0,6,0,0,0,
-                     9,0,4,0,0,0,5,0,0,
-                     2,0,0,0,3,0,0,0,9,
-                     0,0,0,0,4,0,8,0,0,
-                     0,2,0,7,0,0,0,8,0,
-                     5,0,0,9,2,8,0,0,0,
-                     0,0,0,0,0,0,0,6,0]
-        elif puzzle_number == 6:
-            # Expert puzzle from Sudoku.com
-            difficulty = ["Expert", "purple"]
-            input = [5,8,6,4,0,0,0,0,3,
-                     0,0,0,0,8,0,0,0,4,
-                     0,0,0,9,0,0,0,0,7,
-                     0,0,0,0,0,0,0,4,0,
-                     0,0,0,0,0,9,7,2,0,
-                     0,3,0,0,5,0,0,0,1,
-                     7,0,0,0,0,0,0,6,0,
-                     0,5,0,0,3,2,0,0,0,
-                     2,0,0,0,6,0,0,0,0]
-        elif puzzle_number == 7:
-            # Hard puzzle from Sudoku.com
-            difficulty = ["Hard", "red"]
-            input = [1,0,0,0,3,0,4,0,0,
-                     0,0,9,7,0,0,0,0,0,
-                     0,0,0,1,0,6,0,0,3,
-                     6,0,0,9,8,0,0,0,1,
-                     0,0,3,0,0,0,0,0,9,
-                     5,0,0,6,1,0,0,0,0,
-                     0,0,0,0,0,0,0,6,2,
-                     9,8,2,0,0,0,3,0,4,
-                     7,3,0,0,2,0,0,8,0]
-        elif puzzle_number == 8:
-            # Hard puzzle from Sudoku.com
-            difficulty = ["Easy", "green"]
-            input = [0,4,0,6,0,2,0,3,1,
-                     0,0,0,0,0,1,6,0,9,
-                     6,0,0,5,4,0,8,2,7,
-                     0,0,2,7,6,0,0,8,0,
-                     5,0,6,0,0,0,0,7,4,
-                     0,8,7,0,0,5,0,6,2,
-                     1,6,0,0,8,0,0,5,0,
-                     8,2,0,0,0,7,0,9,0,
-                     7,0,0,0,0,6,2,0,0]
+    input, solution = random.choice(puzzle_pools).get()
+    difficulty = rating.difficulty(input)
+    key = board_key(input)
+    solution_cache.put(key, solution)
 
     # "Clean" data for HTML
     for i in range(len(input)):
@@ -184,7 +249,9 @@ def generate_board():
         else:
             input[i] = str(input[i])
 
-    return render_template("index_generated.html", input=input, difficulty=difficulty)
+    return render_template("index_generated.html", input=input, difficulty=difficulty,
+                           difficulty_token=difficulty_signer.dumps(difficulty + [key]))
 
+# Development server only, production runs under gunicorn (see gunicorn.conf.py)
 if __name__ == "__main__":
-    app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", port=5000, host='0.0.0.0')
\ No newline at end of file
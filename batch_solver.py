@@ -0,0 +1,121 @@
+# Batch solver for many puzzles at once (e.g. the rows of a Kaggle-style puzzle,solution csv)
+# Constraint propagation (naked singles and hidden singles) runs as numPy array operations over the whole batch,
+# only the boards that are still unresolved afterwards go through the per-board search (bitmask engine by default)
+
+import numpy as np
+import bitmask_solver
+import solvers
+import validation
+
+ALL_DIGITS = bitmask_solver.ALL_DIGITS
+ROW_OF = np.array(bitmask_solver.ROW_OF)
+COL_OF = np.array(bitmask_solver.COL_OF)
+BLOCK_OF = np.array(bitmask_solver.BLOCK_OF)
+
+# the 27 units (9 rows, 9 columns, 9 blocks) as lists of cell indices
+UNITS = np.array([[ind for ind in range(81) if ROW_OF[ind] == unit] for unit in range(9)] +
+                 [[ind for ind in range(81) if COL_OF[ind] == unit] for unit in range(9)] +
+                 [[ind for ind in range(81) if BLOCK_OF[ind] == unit] for unit in range(9)])
+
+BIT_COUNT = np.array(bitmask_solver.BIT_COUNT, dtype=np.int8)
+SINGLE_DIGIT = np.zeros(ALL_DIGITS + 1, dtype=np.int8)  # digit for masks with exactly one bit set, 0 otherwise
+for digit in range(1, 10):
+    SINGLE_DIGIT[1 << (digit - 1)] = digit
+
+SOLVED = 0
+UNSOLVABLE = -1
+NOT_VIABLE = -2
+
+
+def unit_masks(boards):  # occupancy masks for every unit of every board, shape (N, 27)
+    bits = np.where(boards > 0, np.left_shift(1, np.maximum(boards.astype(np.int32) - 1, 0)), 0)
+    return np.bitwise_or.reduce(bits[:, UNITS], axis=2)
+
+
+def has_duplicates(boards):  # True for every board with a digit repeated inside a unit
+    return (validation.digit_counts(boards.reshape(-1, 9, 9)) > 1).any(axis=(1, 2))
+
+
+def candidates(boards):  # candidate masks for every cell, 0 for cells that are already filled
+    masks = unit_masks(boards)
+    used = masks[:, ROW_OF] | masks[:, 9 + COL_OF] | masks[:, 18 + BLOCK_OF]
+    return np.where(boards == 0, ~used & ALL_DIGITS, 0)
+
+
+def propagate(boards, status):
+    # Applies naked and hidden singles to every board still marked SOLVED in status until nothing changes
+    # boards is modified in place, boards found to be contradictory are marked UNSOLVABLE
+    active = np.flatnonzero((status == SOLVED) & (boards == 0).any(axis=1))
+    while active.size:
+        sub = boards[active]
+        cands = candidates(sub)
+        empty = sub == 0
+
+        # a blank cell with no candidates left means the board has no solution
+        dead = (empty & (cands == 0)).any(axis=1)
+
+        # naked singles: blank cells with exactly one candidate
+        naked = empty & (BIT_COUNT[cands] == 1)
+        placed = np.where(naked, SINGLE_DIGIT[cands], 0)
+
+        # hidden singles: a digit that fits in exactly one cell of a unit
+        # once/twice are built with bitwise ORs over the 9 cells of each unit, so every digit is handled at once
+        unit_cands = cands[:, UNITS]  # (n, 27, 9)
+        once = np.zeros(unit_cands.shape[:2], dtype=cands.dtype)
+        twice = np.zeros_like(once)
+        for pos in range(9):
+            twice |= once & unit_cands[:, :, pos]
+            once |= unit_cands[:, :, pos]
+        dead |= ((~unit_masks(sub) & ALL_DIGITS & ~once) != 0).any(axis=1)  # a missing digit fits nowhere
+        exactly_once = once & ~twice
+        hidden = cands & (exactly_once[:, ROW_OF] | exactly_once[:, 9 + COL_OF] | exactly_once[:, 18 + BLOCK_OF])
+        dead |= (BIT_COUNT[hidden] > 1).any(axis=1)  # two different digits forced into one cell
+        hidden_digit = SINGLE_DIGIT[hidden]
+        dead |= ((placed != 0) & (hidden_digit != 0) & (placed != hidden_digit)).any(axis=1)
+        placed = np.where(placed != 0, placed, hidden_digit)
+
+        progress = (placed != 0).any(axis=1) & ~dead
+        sub = np.where(progress[:, None], sub + placed.astype(sub.dtype), sub)
+        dead |= has_duplicates(sub)  # two singles placed the same digit into one unit
+
+        boards[active] = sub
+        status[active[dead]] = UNSOLVABLE
+        keep = progress & ~dead & (sub == 0).any(axis=1)
+        active = active[keep]
+
+
+def solve_batch(puzzles, engine=solvers.DEFAULT_ENGINE):
+    # puzzles: integer array of shape (N, 81) with 0 for blank cells
+    # returns an int8 array of shape (N, 81) holding the solutions. Rows follow the same convention as
+    # algorithm_revised.solve: all -2 if the puzzle is not viable, all -1 if it has no solution
+    # engine names the solvers.ENGINES entry used for boards that propagation alone can't finish
+    solve_board = solvers.get_engine(engine).solve_board
+    boards = np.array(puzzles, dtype=np.int8).reshape(-1, 81)
+    status = np.full(boards.shape[0], SOLVED, dtype=np.int8)
+
+    # Viability: only digits 0 - 9, at least 17 clues and no repeats in any unit
+    viable = validation.validate_batch(boards)[0]
+    status[~viable] = NOT_VIABLE
+    boards[~viable] = 0
+
+    propagate(boards, status)
+
+    # Whatever propagation could not finish gets searched one board at a time
+    for ind in np.flatnonzero((status == SOLVED) & (boards == 0).any(axis=1)):
+        solution = solve_board(boards[ind].tolist())
+        if solution is None:
+            status[ind] = UNSOLVABLE
+        else:
+            boards[ind] = solution
+
+    boards[status != SOLVED] = status[status != SOLVED, None]
+    return boards
+
+
+def puzzles_from_strings(lines):  # converts 81 character strings ('0' or '.' for blanks) into an (N, 81) array
+    text = "".join(line.strip().replace(".", "0") for line in lines)
+    return (np.frombuffer(text.encode("ascii"), dtype=np.uint8) - ord("0")).astype(np.int8).reshape(-1, 81)
+
+
+def solutions_to_strings(solutions):  # inverse of puzzles_from_strings for solved rows
+    return ["".join(str(value) for value in row) for row in solutions.tolist()]
@@ -0,0 +1,226 @@
+# Benchmark harness: times every solver on the fixed corpus in runtime_test/corpus and writes the results as JSON,
+# so runs on different commits (or machines) can be compared with --compare
+# The corpus files are puzzle,solution csv files (81 characters each, 0 for blanks):
+#   easy.csv     50 boards from generator.generate(36, seed 2015) that rating.py rates Easy
+#   hard.csv     6 well known hard boards (Inkala's 2012 board, Easter Monster, ...) with 21 - 23 clues and 24 boards
+#                from generator.generate(22), which got down to 22 - 25 clues. rating.py rates the 6 known boards and
+#                17 of the generated ones Expert, 3 Hard and 4 Medium
+#   17_clue.csv  5 known 17 clue boards and 15 copies of them moved by random symmetries
+# Every puzzle has exactly one solution, so a solver's answer is checked against the solution column
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from functools import partial
+
+import algorithm
+import algorithm_revised
+import bitmask_solver
+import parallel_search
+import portfolio
+import propagation
+import solvers
+from bitmask_solver import SolveTimeout
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runtime_test", "corpus")
+CORPUS_SETS = ["easy", "hard", "17_clue"]
+PERCENTILES = [50, 90, 99]
+
+
+def to_grid(board):  # flat list of 81 ints -> 9x9 list, the input format of the original solvers
+    return [board[row * 9: row * 9 + 9] for row in range(9)]
+
+
+def load_set(name):  # returns a list of (puzzle, solution) pairs of flat lists
+    pairs = []
+    with open(os.path.join(CORPUS_DIR, name + ".csv")) as file:
+        for line in file:
+            line = line.strip()
+            if line == "" or line[0].isalpha():  # csv header
+                continue
+            puzzle, solution = line.split(",")
+            pairs.append(([int(char) for char in puzzle], [int(char) for char in solution]))
+    return pairs
+
+
+# Every solver takes a flat board and a time limit in seconds and returns a flat list of 81 values:
+# the solution, or one of the -1 / -2 / -3 sentinels. Timeouts may also be raised as SolveTimeout
+
+def run_csp(board, time_limit, propagate=propagation.ROOT, iterative=True):  # the original CSP implementation:
+    # AC-3, then backtracking with MRV and forward checking, run the same way as algorithm.main
+    puzzle = to_grid(board)
+    if not algorithm.is_viable(puzzle):
+        return [-2] * 81
+    csp = algorithm.CSP(puzzle, propagate=propagate)
+    csp.eliminate_domain_values()
+    is_arc_consistent, num_pruned, num_arcs = algorithm.ac_3(csp)
+    if not is_arc_consistent:
+        return [-1] * 81
+    is_success, assignment = algorithm.backtracking_search(csp, time_limit, iterative)
+    return algorithm.convert_1D_array(puzzle, assignment, is_success)
+
+
+def run_revised(board, time_limit):
+    return algorithm_revised.solve(to_grid(board), time_limit)
+
+
+def run_numpy(board, time_limit):  # has no time limit, only run it on request (--solvers revised_numpy)
+    return algorithm_revised.solve_numpy(to_grid(board))
+
+
+def run_engine(engine, board, time_limit):
+    return solvers.solve(to_grid(board), engine, time_limit)
+
+
+def run_bitmask(board, time_limit, propagate=propagation.ROOT):
+    return bitmask_solver.solve(to_grid(board), time_limit, propagate=propagate)
+
+
+def run_portfolio(board, time_limit):  # races portfolio.DEFAULT_STRATEGIES in separate processes; the process start
+    # up is part of the time, so it only pays off on the hard set
+    return portfolio.solve(to_grid(board), time_limit)
+
+
+def run_parallel(board, time_limit):  # splits the board and searches the pieces in a pool of processes, one per core;
+    # like the portfolio it pays for starting the pool on every board
+    return parallel_search.solve(to_grid(board), time_limit=time_limit)
+
+
+SOLVERS = {"csp": run_csp, "revised": run_revised, "revised_numpy": run_numpy, "portfolio": run_portfolio,
+           "parallel": run_parallel}
+SOLVERS.update({name: partial(run_engine, name) for name in solvers.ENGINES if name not in SOLVERS})
+# The engines that propagate with the other propagation levels (propagation.py), for comparison
+for level in (propagation.OFF, propagation.EVERY_NODE):
+    SOLVERS["csp_" + level] = partial(run_csp, propagate=level)
+    SOLVERS["bitmask_" + level] = partial(run_bitmask, propagate=level)
+SOLVERS["csp_recursive"] = partial(run_csp, iterative=False)  # the recursive backtrack instead of IterativeSearch
+DEFAULT_SOLVERS = ["csp", "revised", "bitmask", "dlx"]
+
+
+def percentile(sorted_times, percent):  # nearest-rank percentile of an already sorted list
+    rank = max(int(round(percent / 100 * len(sorted_times))) - 1, 0)
+    return sorted_times[min(rank, len(sorted_times) - 1)]
+
+
+def run_once(solver, board, time_limit):  # returns (result, seconds), result is None on a timeout
+    start = time.perf_counter()
+    try:
+        result = solver(board, time_limit)
+    except SolveTimeout:
+        result = None
+    end = time.perf_counter()
+    if result is not None and result[0] == -3:
+        result = None
+    return result, end - start
+
+
+def benchmark_set(solver, pairs, time_limit, repeat=1, memory=True):  # times one solver on one corpus set
+    times = []
+    timeouts = wrong = 0
+    gc.collect()
+    for puzzle, solution in pairs:
+        best = None
+        for num in range(repeat):  # keep the fastest run, the others mostly measure noise
+            result, seconds = run_once(solver, puzzle, time_limit)
+            best = seconds if best is None else min(best, seconds)
+            if result is None:
+                timeouts += 1
+                break
+            if result != solution:
+                wrong += 1
+                break
+        times.append(best)
+
+    total_time = sum(times)
+    sorted_times = sorted(times)
+    stats = {"puzzles": len(pairs), "timeouts": timeouts, "wrong": wrong, "total_time": total_time,
+             "mean": total_time / len(times), "max": sorted_times[-1],
+             "puzzles_per_sec": len(times) / total_time if total_time > 0 else None}
+    for percent in PERCENTILES:
+        stats["p" + str(percent)] = percentile(sorted_times, percent)
+
+    if memory:  # separate pass, tracemalloc slows pure Python code down too much to time with it on
+        gc.collect()
+        tracemalloc.start()
+        for puzzle, solution in pairs:
+            run_once(solver, puzzle, time_limit)
+        stats["peak_memory_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return stats
+
+
+def run_benchmark(solver_names, set_names, time_limit=10.0, repeat=1, memory=True, log=sys.stderr):
+    results = {}
+    for solver_name in solver_names:
+        results[solver_name] = {}
+        for set_name in set_names:
+            stats = benchmark_set(SOLVERS[solver_name], load_set(set_name), time_limit, repeat, memory)
+            results[solver_name][set_name] = stats
+            print(format_row(solver_name, set_name, stats), file=log)
+    return {"meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                     "platform": platform.platform(), "processor": platform.processor(),
+                     "time_limit": time_limit, "repeat": repeat},
+            "results": results}
+
+
+def format_row(solver_name, set_name, stats):
+    row = "%-14s %-8s p50 %9.2f ms  p90 %9.2f ms  p99 %9.2f ms  %9.1f puzzles/s" % (
+        solver_name, set_name, stats["p50"] * 1000, stats["p90"] * 1000, stats["p99"] * 1000,
+        stats["puzzles_per_sec"] or 0)
+    if "peak_memory_kb" in stats:
+        row += "  peak %8.1f KB" % stats["peak_memory_kb"]
+    if stats["timeouts"] or stats["wrong"]:
+        row += "  (%d timed out, %d wrong)" % (stats["timeouts"], stats["wrong"])
+    return row
+
+
+def compare(baseline, current, threshold):  # prints the p50 change of every solver / set found in both runs,
+    # returns the list of (solver, set) pairs that got slower by more than threshold (0.1 = 10%)
+    regressions = []
+    for solver_name, sets in current["results"].items():
+        for set_name, stats in sets.items():
+            old = baseline["results"].get(solver_name, {}).get(set_name)
+            if old is None:
+                continue
+            change = stats["p50"] / old["p50"] - 1 if old["p50"] > 0 else 0.0
+            flag = ""
+            if change > threshold:
+                regressions.append((solver_name, set_name))
+                flag = "  REGRESSION"
+            print("%-14s %-8s p50 %9.2f ms -> %9.2f ms  %+7.1f%%%s" % (
+                solver_name, set_name, old["p50"] * 1000, stats["p50"] * 1000, change * 100, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the solvers on the fixed corpus in runtime_test/corpus')
+    parser.add_argument('--solvers', nargs='+', choices=sorted(SOLVERS), default=DEFAULT_SOLVERS,
+                        help='Solvers to run (default: ' + ' '.join(DEFAULT_SOLVERS) + ')')
+    parser.add_argument('--sets', nargs='+', choices=CORPUS_SETS, default=CORPUS_SETS, help='Corpus sets to run')
+    parser.add_argument('--time-limit', type=float, default=10.0, help='Seconds allowed per puzzle')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per puzzle, the fastest one counts')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare the p50 times against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Slowdown reported as a regression (0.1 = 10%%)')
+    cmdline = parser.parse_args()
+
+    current = run_benchmark(cmdline.solvers, cmdline.sets, cmdline.time_limit, cmdline.repeat,
+                            not cmdline.no_memory)
+    if cmdline.output:
+        with open(cmdline.output, "w") as file:
+            json.dump(current, file, indent=2, sort_keys=True)
+    if cmdline.compare:
+        with open(cmdline.compare) as file:
+            baseline = json.load(file)
+        if compare(baseline, current, cmdline.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,355 @@
+# Bitmask backtracking engine used by algorithm_revised.solve
+# Every row, column and block keeps an occupancy mask (bit n - 1 is set once digit n is placed in the unit),
+# so placing a value or undoing it is a handful of integer operations instead of rebuilding numPy arrays
+# Before searching, the board goes through constraint propagation (propagation.py), which finishes most boards and
+# leaves the hardest ones with far fewer empty cells
+# Boards of any order in geometry.ORDERS work (16x16 and 25x25 as well as 9x9): the order comes from the length of
+# the flat board and the masks are Python ints, so they are as wide as the board needs
+
+import time
+
+import geometry
+import propagation
+
+# Lookup tables of the standard 9x9 board
+NINE = geometry.get_geometry(3)
+ALL_DIGITS = NINE.all_digits  # bits 0 - 8 set, one for each digit 1 - 9
+ROW_OF = NINE.row_of
+COL_OF = NINE.col_of
+BLOCK_OF = NINE.block_of
+BIT_COUNT = NINE.bit_count  # number of candidates in a mask
+DIGIT_OF = NINE.digit_of  # maps a single bit back to its digit
+
+CHECK_INTERVAL = 1024  # search nodes between two clock reads when a time limit is set
+GRACE_PERIOD = 1.0  # extra seconds to wait for a search in another process that is finishing up after its deadline
+
+
+class SolveTimeout(Exception):  # raised inside a search once its time limit has passed
+    pass
+
+
+class SearchLimit:  # cooperative time limit: the search calls tick() once per node and the clock is only read
+    # every CHECK_INTERVAL nodes, so an adversarial board can't keep a worker busy past its deadline. With a stop
+    # event (threading / multiprocessing.Event) the search also gives up once another process sets it
+    def __init__(self, time_limit=None, stop=None):
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.stop = stop
+        self.countdown = CHECK_INTERVAL
+        self.nodes = 0
+
+    def tick(self):
+        self.countdown -= 1
+        if self.countdown == 0:
+            self.nodes += CHECK_INTERVAL
+            self.countdown = CHECK_INTERVAL
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SolveTimeout()
+            if self.stop is not None and self.stop.is_set():
+                raise SolveTimeout()
+
+
+class SearchStats:  # optional instrumentation, passed as stats= to the solvers. Counts search nodes, backtracks
+    # (nodes whose subtree held no solution), pruned values and processed arcs, and adds up the time spent in each
+    # phase. Doubles as a SearchLimit: the searches call tick() once per node. Solvers only touch it when one is given
+    def __init__(self, time_limit=None):
+        self.deadline = None
+        self.set_time_limit(time_limit)
+        self.nodes = 0
+        self.backtracks = 0
+        self.pruned = 0
+        self.arcs = 0
+        self.phase_times = {}
+
+    def set_time_limit(self, time_limit):
+        if time_limit is not None:
+            self.deadline = time.perf_counter() + time_limit
+
+    def tick(self):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % CHECK_INTERVAL == 0 and time.perf_counter() >= self.deadline:
+            raise SolveTimeout()
+
+    def record_search(self, start_nodes, path_length, solved):  # backtracks of a first-solution search: every
+        # node visited since start_nodes that is not on the path to the solution (path_length nodes) failed
+        nodes = self.nodes - start_nodes
+        self.backtracks += max(nodes - path_length, 0) if solved else nodes
+
+    def add_time(self, phase, seconds):
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+
+    def as_dict(self):
+        return {"nodes": self.nodes, "backtracks": self.backtracks, "pruned": self.pruned, "arcs": self.arcs,
+                "phase_times": dict(self.phase_times)}
+
+
+def make_limit(time_limit, stats):  # the object the searches tick: stats if given, else a plain time limit or None
+    if stats is not None:
+        stats.set_time_limit(time_limit)
+        return stats
+    if time_limit is not None:
+        return SearchLimit(time_limit)
+    return None
+
+
+def flatten(input_arr):  # converts the 2D input list used by the website into a flat list of ints
+    board = []
+    for row in range(len(input_arr)):
+        for col in range(len(input_arr[row])):
+            board.append(int(input_arr[row][col]))
+    return board
+
+
+def build_masks(board, geo=None):  # builds the row, column and block occupancy masks for a flat board
+    # returns None if a digit appears twice in the same unit
+    geo = geo or geometry.for_board(board)
+    row_of, col_of, block_of = geo.row_of, geo.col_of, geo.block_of
+    rows = [0] * geo.size
+    cols = [0] * geo.size
+    blocks = [0] * geo.size
+    for ind in range(geo.cells):
+        value = board[ind]
+        if value != 0:
+            bit = 1 << (value - 1)
+            row, col, block = row_of[ind], col_of[ind], block_of[ind]
+            if (rows[row] | cols[col] | blocks[block]) & bit:
+                return None
+            rows[row] |= bit
+            cols[col] |= bit
+            blocks[block] |= bit
+    return rows, cols, blocks
+
+
+def is_viable(board):  # values 0 - size, at least 17 clues (on 9x9 boards) and no repeated digit in a unit. Used for
+    # single boards by every solver, validation.validate_batch is the vectorized version for many boards
+    order = geometry.order_of(len(board))
+    if order is None:
+        return False
+    geo = geometry.get_geometry(order)
+    for value in board:
+        if not 0 <= value <= geo.size:
+            return False
+    if geo.cells - board.count(0) < geo.min_clues:
+        return False
+    return build_masks(board, geo) is not None
+
+
+def failed(board, code):  # the result list the solve() functions return instead of a solution: code (-1, -2 or -3)
+    # in every cell, as many cells as the board has (81 if its length fits no board order)
+    return [code] * (len(board) if geometry.order_of(len(board)) else 81)
+
+
+def solve_with(solve_board, input_arr, *args):  # the solve() contract of every engine: the 2D board is flattened
+    # and checked, solve_board(board, *args) solves it and its None / SolveTimeout become the -1 / -3 results
+    board = flatten(input_arr)
+    if not is_viable(board):
+        return failed(board, -2)
+    try:
+        solution = solve_board(board, *args)
+    except SolveTimeout:
+        return failed(board, -3)
+    if solution is None:
+        return failed(board, -1)
+    return solution
+
+
+def search(board, empties, depth, rows, cols, blocks, limit=None, geo=NINE):
+    # Fills board[empties[depth:]] in place. The most constrained cell (fewest candidates) is picked at every
+    # level and swapped into position depth, so the list of empty cells never gets rebuilt
+    if limit is not None:
+        limit.tick()
+    if depth == len(empties):
+        return True
+    row_of, col_of, block_of, bit_count, digit_of, all_digits, best_count = geo.search_tables
+    best_pos = depth
+    best_cands = 0
+    for pos in range(depth, len(empties)):
+        ind = empties[pos]
+        cands = ~(rows[row_of[ind]] | cols[col_of[ind]] | blocks[block_of[ind]]) & all_digits
+        count = bit_count[cands]
+        if count < best_count:
+            best_pos, best_count, best_cands = pos, count, cands
+            if count <= 1:  # can't do better than a forced (or dead) cell
+                break
+    if best_count == 0:  # some cell has no legal value left
+        return False
+
+    empties[depth], empties[best_pos] = empties[best_pos], empties[depth]
+    ind = empties[depth]
+    row, col, block = row_of[ind], col_of[ind], block_of[ind]
+    cands = best_cands
+    while cands:
+        bit = cands & -cands  # lowest remaining candidate
+        cands ^= bit
+        rows[row] |= bit
+        cols[col] |= bit
+        blocks[block] |= bit
+        board[ind] = digit_of[bit]
+        if search(board, empties, depth + 1, rows, cols, blocks, limit, geo):
+            return True
+        rows[row] ^= bit  # undo the placement
+        cols[col] ^= bit
+        blocks[block] ^= bit
+    board[ind] = 0
+    return False
+
+
+def count_search(board, empties, depth, rows, cols, blocks, max_count, limit=None, geo=NINE):
+    # Same search as above, but keeps going after a solution and returns how many were found (at most max_count)
+    if limit is not None:
+        limit.tick()
+    if depth == len(empties):
+        return 1
+    row_of, col_of, block_of, bit_count, digit_of, all_digits, best_count = geo.search_tables
+    best_pos = depth
+    best_cands = 0
+    for pos in range(depth, len(empties)):
+        ind = empties[pos]
+        cands = ~(rows[row_of[ind]] | cols[col_of[ind]] | blocks[block_of[ind]]) & all_digits
+        count = bit_count[cands]
+        if count < best_count:
+            best_pos, best_count, best_cands = pos, count, cands
+            if count <= 1:
+                break
+    if best_count == 0:
+        return 0
+
+    empties[depth], empties[best_pos] = empties[best_pos], empties[depth]
+    ind = empties[depth]
+    row, col, block = row_of[ind], col_of[ind], block_of[ind]
+    cands = best_cands
+    found = 0
+    while cands and found < max_count:
+        bit = cands & -cands
+        cands ^= bit
+        rows[row] |= bit
+        cols[col] |= bit
+        blocks[block] |= bit
+        board[ind] = digit_of[bit]
+        found += count_search(board, empties, depth + 1, rows, cols, blocks, max_count - found, limit, geo)
+        rows[row] ^= bit
+        cols[col] ^= bit
+        blocks[block] ^= bit
+    board[ind] = 0
+    return found
+
+
+def propagate_search(board, cands, depth=0, limit=None):
+    # Search that runs propagation.propagate at every node (solve_board with propagate="node"). Works on copies, so
+    # nothing needs undoing. Returns (solved board, number of nodes on the path to it) or (None, 0)
+    if limit is not None:
+        limit.tick()
+    if not propagation.propagate(board, cands):
+        return None, 0
+    geo = geometry.for_board(board)
+    bit_count = geo.bit_count
+    best_ind = None
+    best_count = geo.size + 1
+    for ind in range(geo.cells):
+        if board[ind] == 0 and bit_count[cands[ind]] < best_count:
+            best_ind, best_count = ind, bit_count[cands[ind]]
+            if best_count == 2:  # propagation leaves no single candidates, so this is as good as it gets
+                break
+    if best_ind is None:
+        return board, depth + 1
+    cands_left = cands[best_ind]
+    while cands_left:
+        bit = cands_left & -cands_left
+        cands_left ^= bit
+        next_board, next_cands = list(board), list(cands)
+        propagation.place(next_board, next_cands, best_ind, geo.digit_of[bit])
+        solution, path_length = propagate_search(next_board, next_cands, depth + 1, limit)
+        if solution is not None:
+            return solution, path_length
+    return None, 0
+
+
+def propagate_root(board, stats=None):  # propagates a flat board in place before a search, returns False if that
+    # shows it has no solution
+    start = time.perf_counter()
+    consistent = propagation.propagate(board, propagation.initial_candidates(board))
+    if stats is not None:
+        stats.add_time("propagate", time.perf_counter() - start)
+    return consistent
+
+
+def count_solutions(board, limit=2, time_limit=None, stats=None, propagate=propagation.ROOT):  # counts the
+    # solutions of a flat board, stopping once limit are found. Raises SolveTimeout if time_limit (seconds) runs out
+    # first. propagate="off" skips the propagation before the search (it never changes the count)
+    board = list(board)
+    geo = geometry.for_board(board)
+    if build_masks(board, geo) is None:
+        return 0
+    if propagate != propagation.OFF and not propagate_root(board, stats):
+        return 0
+    rows, cols, blocks = build_masks(board, geo)
+    empties = [ind for ind in range(geo.cells) if board[ind] == 0]
+    return count_search(board, empties, 0, rows, cols, blocks, limit, make_limit(time_limit, stats), geo)
+
+
+def has_other_solution(board, ind, value, time_limit=None, stats=None):  # board is a flat board with a solution
+    # that has value at the empty cell ind. Returns True if it also has a solution with another digit there, which
+    # is what a solution count of two would tell, without having to find the known solution again
+    board = list(board)
+    geo = geometry.for_board(board)
+    masks = build_masks(board, geo)
+    if masks is None:
+        return False
+    rows, cols, blocks = masks
+    row, col, block = geo.row_of[ind], geo.col_of[ind], geo.block_of[ind]
+    cands = ~(rows[row] | cols[col] | blocks[block] | 1 << (value - 1)) & geo.all_digits
+    empties = [pos for pos in range(geo.cells) if board[pos] == 0 and pos != ind]
+    search_limit = make_limit(time_limit, stats)
+    while cands:
+        bit = cands & -cands
+        cands ^= bit
+        rows[row] |= bit
+        cols[col] |= bit
+        blocks[block] |= bit
+        board[ind] = geo.digit_of[bit]
+        if search(board, empties, 0, rows, cols, blocks, search_limit, geo):
+            return True
+        rows[row] ^= bit
+        cols[col] ^= bit
+        blocks[block] ^= bit
+    return False
+
+
+def solve_board(board, time_limit=None, stats=None, propagate=propagation.ROOT):  # solves a flat list of ints
+    # (81 for a 9x9 board), returns the solved flat list or None if there is no solution. Raises SolveTimeout if
+    # time_limit (seconds) runs out first. propagate is one of propagation.LEVELS: "root" (default) propagates once
+    # before the search, "node" at every search node and "off" not at all
+    board = list(board)
+    geo = geometry.for_board(board)
+    if build_masks(board, geo) is None:
+        return None
+    search_limit = make_limit(time_limit, stats)
+    if propagate == propagation.EVERY_NODE:
+        start = time.perf_counter()
+        start_nodes = stats.nodes if stats is not None else 0
+        try:
+            solution, path_length = propagate_search(board, propagation.initial_candidates(board), 0, search_limit)
+        finally:
+            if stats is not None:
+                stats.add_time("search", time.perf_counter() - start)
+        if stats is not None:
+            stats.record_search(start_nodes, path_length, solution is not None)
+        return solution
+    if propagate == propagation.ROOT and not propagate_root(board, stats):
+        return None
+    rows, cols, blocks = build_masks(board, geo)
+    empties = [ind for ind in range(geo.cells) if board[ind] == 0]
+    if stats is None:
+        return board if search(board, empties, 0, rows, cols, blocks, search_limit, geo) else None
+    start, start_nodes = time.perf_counter(), stats.nodes
+    try:
+        solved = search(board, empties, 0, rows, cols, blocks, search_limit, geo)
+    finally:
+        stats.add_time("search", time.perf_counter() - start)
+    stats.record_search(start_nodes, len(empties) + 1, solved)
+    return board if solved else None
+
+
+def solve(input_arr, time_limit=None, stats=None, propagate=propagation.ROOT):  # same contract as
+    # algorithm_revised.solve: 2D list in (9x9, 16x16, ...), flat list out. All -2 means the puzzle was not viable,
+    # all -1 means it has no solution, all -3 means the search ran out of time
+    return solve_with(solve_board, input_arr, time_limit, stats, propagate)
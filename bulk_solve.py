@@ -0,0 +1,124 @@
+# Bulk solver for puzzle files: Kaggle-format csv (puzzle,solution per line, see runtime_test/corpus), 81 character
+# lines or 9-line grids, read with puzzle_io
+# The input is streamed in chunks, every chunk is solved with batch_solver.solve_batch in a worker process,
+# and the results are written back in input order. 16x16 and 25x25 files (--order) are solved one board at a time
+# by the engine instead, as batch_solver only handles 9x9 boards. Only a bounded number of chunks is in flight at
+# any time, so memory use stays the same no matter how large the file is
+
+import argparse
+import collections
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import batch_solver
+import geometry
+import puzzle_io
+import solvers
+
+
+def read_chunks(records, chunk_size):  # groups (puzzle, solution) records into lists of up to chunk_size
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def solve_chunk(records, engine=solvers.DEFAULT_ENGINE, order=geometry.DEFAULT_ORDER):
+    # Runs in a worker process. Returns one (puzzle, solution) output pair per input record plus the number of
+    # solutions that did not match the solution column of the input (if the input has one)
+    num_cells = geometry.get_geometry(order).cells
+    symbols = set(puzzle_io.SYMBOLS[:order * order + 1])
+    puzzles = []
+    malformed = []
+    for puzzle, expected in records:
+        if len(puzzle) != num_cells or not set(puzzle) <= symbols:  # a line the reader couldn't parse
+            malformed.append(True)
+            puzzle = "0" * num_cells  # placeholder, reported as not viable below
+        else:
+            malformed.append(False)
+        puzzles.append(puzzle)
+
+    if order == geometry.DEFAULT_ORDER:
+        solutions = batch_solver.solve_batch(batch_solver.puzzles_from_strings(puzzles), engine)
+        solutions[np.array(malformed, dtype=bool)] = batch_solver.NOT_VIABLE
+        solutions = solutions.tolist()
+    else:
+        solutions = [[batch_solver.NOT_VIABLE] * num_cells if bad else solvers.solve(puzzle_io.to_grid(puzzle), engine)
+                     for puzzle, bad in zip(puzzles, malformed)]
+
+    output = []
+    mismatches = 0
+    for (puzzle, expected), solution in zip(records, solutions):
+        solution_str = puzzle_io.board_string(solution)  # -1 (no solution) or -2 (not viable) if unsolved
+        if expected is not None and expected != solution_str:
+            mismatches += 1
+        output.append((puzzle, solution_str))
+    return output, mismatches
+
+
+def bulk_solve(records, writer, workers=None, chunk_size=10000, engine=solvers.DEFAULT_ENGINE,
+               order=geometry.DEFAULT_ORDER):
+    # Solves an iterable of (puzzle, solution) records (puzzle_io.read_puzzles) and writes the results to a
+    # puzzle_io.PuzzleWriter as each chunk finishes. Returns the number of puzzles processed and the number of
+    # mismatches against the input's solution column
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2  # enough queued work to keep every worker busy while the writer catches up
+    num_puzzles = 0
+    num_mismatches = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for chunk in read_chunks(records, chunk_size):
+            pending.append(executor.submit(solve_chunk, chunk, engine, order))
+            num_puzzles += len(chunk)
+            if len(pending) >= max_pending:
+                num_mismatches += write_output(pending.popleft().result(), writer)
+        while pending:
+            num_mismatches += write_output(pending.popleft().result(), writer)
+    return num_puzzles, num_mismatches
+
+
+def write_output(result, writer):  # writes one solved chunk, returns its number of mismatches
+    output, mismatches = result
+    for puzzle, solution in output:
+        writer.write(puzzle, solution)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve every puzzle in a file (Kaggle-format csv, 81 character '
+                                                 'lines or 9-line grids) using a pool of worker processes')
+    parser.add_argument('input', help='The input file, or - for stdin')
+    parser.add_argument('output', help='The output file, or - for stdout')
+    parser.add_argument('--format', choices=['csv', 'line', 'grid'], default='csv',
+                        help='Output format: puzzle,solution csv (default), one solution per line or 9-line grids')
+    parser.add_argument('--mmap', action='store_true', help='Memory-map the input file instead of reading it')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: all cores)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Number of puzzles sent to a worker at once')
+    parser.add_argument('--engine', choices=sorted(solvers.ENGINES), default=solvers.DEFAULT_ENGINE,
+                        help='Search engine for boards that propagation alone does not finish')
+    parser.add_argument('--order', type=int, choices=geometry.ORDERS, default=geometry.DEFAULT_ORDER,
+                        help='Board order: 3 for 9x9 puzzles (default), 4 for 16x16, 5 for 25x25')
+    cmdline = parser.parse_args()
+
+    # bad lines come out as -2
+    records = puzzle_io.read_puzzles(cmdline.input, cmdline.mmap, errors="keep", order=cmdline.order)
+    start = time.perf_counter()
+    with puzzle_io.PuzzleWriter(cmdline.output, cmdline.format) as writer:
+        num_puzzles, num_mismatches = bulk_solve(records, writer, cmdline.workers, cmdline.chunk_size,
+                                                  cmdline.engine, cmdline.order)
+    end = time.perf_counter()
+    total_time = end - start
+    print("Puzzles solved: ", num_puzzles, file=sys.stderr)
+    print("Solutions not matching the input: ", num_mismatches, file=sys.stderr)
+    print("Runtime: ", total_time, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# Canonical form of a Sudoku board under the symmetries that preserve solvability:
+# digit relabeling, row swaps within a band, band swaps, column swaps within a stack, stack swaps and transposing.
+# Equivalent boards (relabeled, rotated, reflected or shuffled copies of each other) get the same canonical board,
+# so one cached solution serves all of them. The transform is recorded so a solution of the canonical board can be
+# mapped back onto the original board
+
+import time
+from itertools import permutations, product
+
+TRIPLE_ORDERS = list(permutations(range(3)))
+
+# Most partial transforms canonicalize keeps tied at once. Real puzzles stay at or below 1296, boards with few clues
+# (whose blank rows all tie) grow without bound and are given up on instead
+MAX_CANDIDATES = 5000
+
+# Every column order reachable by swapping stacks and swapping columns within a stack (6 * 6^3 = 1296 orders)
+COLUMN_ORDERS = [tuple(stack * 3 + within[stack][pos] for stack in stack_order for pos in range(3))
+                 for stack_order in TRIPLE_ORDERS for within in product(TRIPLE_ORDERS, repeat=3)]
+
+
+def to_grid(board):  # flat list of 81 ints -> tuple of 9 row tuples
+    return tuple(tuple(board[row * 9: row * 9 + 9]) for row in range(9))
+
+
+def transpose(grid):
+    return tuple(zip(*grid))
+
+
+def relabel_row(row, col_order, labels, next_label):
+    # Applies the digit relabeling built so far to row (read in col_order), giving digits that have not been
+    # seen yet the next free labels. Returns the relabeled row, the extended labels and the next free label
+    labels = list(labels)
+    out = []
+    for col in col_order:
+        value = row[col]
+        if value != 0 and labels[value] == 0:
+            labels[value] = next_label
+            next_label += 1
+        out.append(labels[value])
+    return tuple(out), tuple(labels), next_label
+
+
+def canonicalize(board, max_candidates=MAX_CANDIDATES, time_limit=None):
+    # Returns (canonical board as a flat list, transform). The canonical board is the lexicographically smallest
+    # board (digits relabeled in order of first appearance, blanks stay 0) over the whole symmetry group.
+    # Rows are fixed one at a time and only the partial transforms that tie for the smallest prefix are kept.
+    # Returns None if more than max_candidates of them tie or it takes longer than time_limit seconds
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    grids = (to_grid(board), transpose(to_grid(board)))
+    # each candidate: (grid number, column order, rows used so far, digit labels, next free label)
+    candidates = [(grid_num, col_order, (), (0,) * 10, 1) for grid_num in range(2) for col_order in COLUMN_ORDERS]
+    prefix = []
+    for step in range(9):
+        best_row = None
+        next_candidates = []
+        for grid_num, col_order, rows_used, labels, next_label in candidates:
+            if step % 3 == 0:  # starting a new band: any row of a band that has not been used yet
+                used_bands = {row // 3 for row in rows_used}
+                choices = [row for row in range(9) if row // 3 not in used_bands]
+            else:  # continuing the current band
+                band = rows_used[-1] // 3
+                choices = [row for row in range(band * 3, band * 3 + 3) if row not in rows_used]
+            grid = grids[grid_num]
+            for row in choices:
+                out, new_labels, new_next = relabel_row(grid[row], col_order, labels, next_label)
+                if best_row is None or out < best_row:
+                    best_row = out
+                    next_candidates = []
+                if out == best_row:
+                    next_candidates.append((grid_num, col_order, rows_used + (row,), new_labels, new_next))
+                    if len(next_candidates) > max_candidates:
+                        return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        candidates = next_candidates
+        prefix.extend(best_row)
+
+    # Any of the remaining candidates gives the same canonical board. Digits missing from the board get the
+    # remaining labels in increasing order so the relabeling is a full permutation of 1 - 9
+    grid_num, col_order, row_order, labels, next_label = min(candidates)
+    labels = list(labels)
+    for value in range(1, 10):
+        if labels[value] == 0:
+            labels[value] = next_label
+            next_label += 1
+    transform = (grid_num == 1, row_order, col_order, tuple(labels))
+    return prefix, transform
+
+
+def apply_transform(board, transform):  # maps any board (e.g. a solution) of the original frame to the canonical one
+    transposed, row_order, col_order, labels = transform
+    grid = to_grid(board)
+    if transposed:
+        grid = transpose(grid)
+    return [labels[grid[row][col]] if grid[row][col] > 0 else grid[row][col] for row in row_order for col in col_order]
+
+
+def invert_transform(board, transform):  # maps a board of the canonical frame back to the original frame
+    transposed, row_order, col_order, labels = transform
+    digits = [0] * 10
+    for value in range(1, 10):
+        digits[labels[value]] = value
+    grid = [[0] * 9 for row in range(9)]
+    for row_pos in range(9):
+        for col_pos in range(9):
+            value = board[row_pos * 9 + col_pos]
+            grid[row_order[row_pos]][col_order[col_pos]] = digits[value] if value > 0 else value
+    if transposed:
+        grid = [list(row) for row in zip(*grid)]
+    return [value for row in grid for value in row]
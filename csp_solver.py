@@ -0,0 +1,51 @@
+# CSP engine: the implementation in algorithm.py (AC-3, MRV / degree buckets, forward checking and propagation,
+# searched with IterativeSearch) behind the same interface as the other engines in solvers.py, so it can be picked
+# by name and raced against them (portfolio.py)
+
+import time
+
+import algorithm
+import bitmask_solver
+import geometry
+import propagation
+
+
+def to_grid(board):  # flat list -> 2D list, the input format of algorithm.CSP
+    size = geometry.for_board(board).size
+    return [list(board[row * size: row * size + size]) for row in range(size)]
+
+
+def count_solutions(board, limit=2, time_limit=None, stats=None):  # counts the solutions of a flat board,
+    # stopping once limit are found. Raises bitmask_solver.SolveTimeout if time_limit (seconds) runs out first
+    if bitmask_solver.build_masks(board) is None:
+        return 0
+    csp = algorithm.CSP(to_grid(board), stats)
+    csp.eliminate_domain_values()
+    if not algorithm.ac_3(csp)[0] or not csp.propagate():
+        return 0
+    search = algorithm.IterativeSearch(csp, time_limit, limit)
+    search.run()
+    return search.found
+
+
+def solve_board(board, time_limit=None, stats=None, propagate=propagation.ROOT):  # solves a flat board of any
+    # order, returns the solved flat list or None if there is no solution. Raises bitmask_solver.SolveTimeout if
+    # time_limit (seconds) runs out first
+    if bitmask_solver.build_masks(board) is None:
+        return None
+    puzzle = to_grid(board)
+    start = time.perf_counter()
+    csp = algorithm.CSP(puzzle, stats, propagate)
+    csp.eliminate_domain_values()
+    if stats is not None:
+        stats.add_time("setup", time.perf_counter() - start)
+    if not algorithm.ac_3(csp)[0]:
+        return None
+    is_success, assignment = algorithm.backtracking_search(csp, time_limit)
+    if not is_success:
+        return None
+    return algorithm.convert_1D_array(puzzle, assignment, is_success)
+
+
+def solve(input_arr, time_limit=None, stats=None):  # same contract as algorithm_revised.solve
+    return bitmask_solver.solve_with(solve_board, input_arr, time_limit, stats)
@@ -0,0 +1,193 @@
+# Dancing Links (Knuth's Algorithm X) engine
+# Sudoku is encoded as an exact cover problem: for a 9x9 board, 729 candidate rows (cell, digit) and 324 columns
+# (each cell filled once, each digit once per row, once per column and once per block). Larger boards (see
+# geometry.py) get size ** 3 rows and 4 * size ** 2 columns the same way.
+# The node links live in flat Python lists (left, right, up, down, column) indexed by node number instead of
+# one object per node, and the template matrix of each board order is built once and copied for every solve
+
+import time
+
+import bitmask_solver
+import geometry
+
+ROOT = 0
+
+
+def build_template(geo):
+    # node 0 is the root, nodes 1 - num_columns are the column headers, every candidate row then adds 4 nodes
+    size, cells = geo.size, geo.cells
+    num_columns = 4 * cells
+    num_nodes = 1 + num_columns + cells * size * 4
+    left = [0] * num_nodes
+    right = [0] * num_nodes
+    up = list(range(num_nodes))
+    down = list(range(num_nodes))
+    column = list(range(num_nodes))
+    col_size = [0] * (1 + num_columns)
+    row_of = [-1] * num_nodes  # which candidate row (cell * size + digit - 1) a node belongs to
+
+    for node in range(1 + num_columns):  # circular header list through the root
+        left[node] = node - 1 if node > 0 else num_columns
+        right[node] = node + 1 if node < num_columns else 0
+
+    node = 1 + num_columns
+    for cell in range(cells):
+        row, col, block = geo.row_of[cell], geo.col_of[cell], geo.block_of[cell]
+        for digit in range(size):
+            headers = [1 + cell, 1 + cells + row * size + digit, 1 + 2 * cells + col * size + digit,
+                       1 + 3 * cells + block * size + digit]
+            first = node
+            for pos in range(4):
+                header = headers[pos]
+                column[node] = header
+                row_of[node] = cell * size + digit
+                # insert at the bottom of the header's column
+                up[node] = up[header]
+                down[node] = header
+                down[up[header]] = node
+                up[header] = node
+                col_size[header] += 1
+                # link into the row
+                left[node] = first + (pos - 1) % 4
+                right[node] = first + (pos + 1) % 4
+                node += 1
+    return left, right, up, down, column, col_size, row_of
+
+
+TEMPLATES = {3: build_template(geometry.get_geometry(3))}  # board order -> template, 9x9 is built at import
+
+
+def get_template(geo):
+    if geo.order not in TEMPLATES:
+        TEMPLATES[geo.order] = build_template(geo)
+    return TEMPLATES[geo.order]
+
+
+def cover(col, left, right, up, down, column, size):
+    right[left[col]] = right[col]
+    left[right[col]] = left[col]
+    row_node = down[col]
+    while row_node != col:
+        node = right[row_node]
+        while node != row_node:
+            down[up[node]] = down[node]
+            up[down[node]] = up[node]
+            size[column[node]] -= 1
+            node = right[node]
+        row_node = down[row_node]
+
+
+def uncover(col, left, right, up, down, column, size):
+    row_node = up[col]
+    while row_node != col:
+        node = left[row_node]
+        while node != row_node:
+            size[column[node]] += 1
+            down[up[node]] = node
+            up[down[node]] = node
+            node = left[node]
+        row_node = up[row_node]
+    right[left[col]] = col
+    left[right[col]] = col
+
+
+class DancingLinks:  # one exact cover matrix for a single puzzle, with the clues already selected
+    def __init__(self, board, time_limit=None, stats=None):
+        self.geo = geometry.for_board(board)
+        template = get_template(self.geo)
+        self.left, self.right, self.up, self.down, self.column, self.size = [list(arr) for arr in template[:6]]
+        self.row_of = template[6]
+        self.board = list(board)
+        self.solutions = []
+        self.count = 0
+        self.limit = bitmask_solver.make_limit(time_limit, stats)
+        links = self.left, self.right, self.up, self.down, self.column, self.size
+        first_row_node = 1 + 4 * self.geo.cells
+        for cell in range(self.geo.cells):  # the given clues are selected up front by covering their 4 columns
+            value = board[cell]
+            if value != 0:
+                first = first_row_node + (cell * self.geo.size + value - 1) * 4
+                for node in range(first, first + 4):
+                    cover(self.column[node], *links)
+
+    def search(self, partial, max_count):  # returns True once max_count solutions have been found
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        if self.limit is not None:
+            self.limit.tick()  # raises bitmask_solver.SolveTimeout once the time limit has passed
+        if right[ROOT] == ROOT:  # every column is covered - a full solution
+            self.count += 1
+            if not self.solutions:
+                solution = list(self.board)
+                digits = self.geo.size
+                for row in partial:
+                    solution[row // digits] = row % digits + 1
+                self.solutions.append(solution)
+            return self.count >= max_count
+
+        # choose the column with the fewest remaining rows (Knuth's S heuristic)
+        best = right[ROOT]
+        col = right[best]
+        while col != ROOT:
+            if size[col] < size[best]:
+                best = col
+                if size[col] <= 1:
+                    break
+            col = right[col]
+        if size[best] == 0:
+            return False
+
+        cover(best, left, right, up, down, column, size)
+        done = False
+        row_node = down[best]
+        while row_node != best:
+            partial.append(self.row_of[row_node])
+            node = right[row_node]
+            while node != row_node:
+                cover(column[node], left, right, up, down, column, size)
+                node = right[node]
+            done = self.search(partial, max_count)
+            node = left[row_node]
+            while node != row_node:
+                uncover(column[node], left, right, up, down, column, size)
+                node = left[node]
+            partial.pop()
+            if done:
+                break
+            row_node = down[row_node]
+        uncover(best, left, right, up, down, column, size)
+        return done
+
+
+def count_solutions(board, limit=2, time_limit=None, stats=None):  # counts the solutions of a flat board,
+    # stopping once limit are found. Raises bitmask_solver.SolveTimeout if time_limit (seconds) runs out first
+    if bitmask_solver.build_masks(board) is None:
+        return 0
+    matrix = DancingLinks(board, time_limit, stats)
+    matrix.search([], limit)
+    return matrix.count
+
+
+def solve_board(board, time_limit=None, stats=None):  # solves a flat board of any order, returns the solved flat
+    # list or None if there is no solution. Raises bitmask_solver.SolveTimeout if time_limit (seconds) runs out first
+    if bitmask_solver.build_masks(board) is None:
+        return None
+    if stats is None:
+        matrix = DancingLinks(board, time_limit)
+        matrix.search([], 1)
+    else:
+        start, start_nodes = time.perf_counter(), stats.nodes
+        matrix = DancingLinks(board, time_limit, stats)
+        stats.add_time("setup", time.perf_counter() - start)
+        start = time.perf_counter()
+        try:
+            matrix.search([], 1)
+        finally:
+            stats.add_time("search", time.perf_counter() - start)
+        stats.record_search(start_nodes, board.count(0) + 1, bool(matrix.solutions))
+    if matrix.solutions:
+        return matrix.solutions[0]
+    return None
+
+
+def solve(input_arr, time_limit=None, stats=None):  # same contract as algorithm_revised.solve
+    return bitmask_solver.solve_with(solve_board, input_arr, time_limit, stats)
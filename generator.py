@@ -0,0 +1,127 @@
+# Puzzle generator: fills a random complete grid, then removes clues one at a time as long as the board keeps
+# exactly one solution (checked by searching for a solution with another digit in the emptied cell)
+# generate() is seedable and takes a target clue count. PuzzlePool keeps a queue of ready puzzles that a background
+# thread tops up, so the web app can hand one out without generating it during the request
+
+import argparse
+import queue
+import random
+import sys
+import threading
+import time
+
+import bitmask_solver
+import canonical
+
+MIN_CLUES = 17  # no uniquely solvable 9x9 board has fewer clues
+
+
+def random_solution(rng):  # returns a random complete grid as a flat list of 81 ints
+    # The three blocks on the diagonal don't share a row or column, so each one can be filled with an independent
+    # shuffle of 1 - 9. The rest of the grid is completed by the solver and then moved by a random symmetry
+    # (row / column / band / stack shuffles, transposing and relabeling), which keeps it a valid solution
+    board = [0] * 81
+    for block in range(3):
+        digits = list(range(1, 10))
+        rng.shuffle(digits)
+        for pos in range(9):
+            board[(block * 3 + pos // 3) * 9 + block * 3 + pos % 3] = digits[pos]
+    board = bitmask_solver.solve_board(board)
+    labels = list(range(1, 10))
+    rng.shuffle(labels)
+    transform = (rng.random() < 0.5, rng.choice(canonical.COLUMN_ORDERS), rng.choice(canonical.COLUMN_ORDERS),
+                 tuple([0] + labels))
+    return canonical.apply_transform(board, transform)
+
+
+def remove_clues(solution, target_clues, rng):  # removes clues from a complete grid in random order, keeping
+    # the puzzle unique, until target_clues are left or no clue can be removed any more. Returns the puzzle
+    board = list(solution)
+    num_clues = 81
+    cells = list(range(81))
+    rng.shuffle(cells)
+    for ind in cells:
+        if num_clues <= target_clues:
+            break
+        value = board[ind]
+        board[ind] = 0
+        if not bitmask_solver.has_other_solution(board, ind, value):
+            num_clues -= 1
+        else:
+            board[ind] = value  # removing this clue would allow a second solution
+    return board
+
+
+def generate(target_clues=MIN_CLUES, seed=None, rng=None, attempts=1):  # returns (puzzle, solution),
+    # both flat lists of 81 ints with 0 for blanks. The puzzle has a unique solution and target_clues clues,
+    # or as few as could be reached in the given number of attempts (boards below ~22 clues are rare)
+    if rng is None:
+        rng = random.Random(seed)
+    target_clues = max(target_clues, MIN_CLUES)
+    best = None
+    for attempt in range(attempts):
+        solution = random_solution(rng)
+        puzzle = remove_clues(solution, target_clues, rng)
+        if best is None or puzzle.count(0) > best[0].count(0):
+            best = (puzzle, solution)
+        if 81 - puzzle.count(0) <= target_clues:
+            break
+    return best
+
+
+class PuzzlePool:
+    # Queue of up to size pre-generated (puzzle, solution) pairs, refilled by a daemon thread.
+    # get() takes a puzzle from the queue, or generates one on the spot if the pool has run dry
+    def __init__(self, size=10, target_clues=MIN_CLUES, seed=None, attempts=1):
+        self.target_clues = target_clues
+        self.attempts = attempts
+        self.rng = random.Random(seed)
+        self.puzzles = queue.Queue(maxsize=size)
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):  # starts the background thread, called on first use so importing doesn't spawn threads
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.fill, daemon=True)
+                self.thread.start()
+
+    def fill(self):
+        while True:
+            self.puzzles.put(generate(self.target_clues, rng=self.rng, attempts=self.attempts))  # blocks when full
+
+    def get(self):
+        self.start()
+        try:
+            return self.puzzles.get_nowait()
+        except queue.Empty:
+            return generate(self.target_clues, rng=random.Random(), attempts=self.attempts)
+
+    def __len__(self):
+        return self.puzzles.qsize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate uniquely solvable Sudoku puzzles, one 81 character line '
+                                                 '(0 for blanks) per puzzle')
+    parser.add_argument('--count', type=int, default=1, help='Number of puzzles to generate')
+    parser.add_argument('--clues', type=int, default=MIN_CLUES, help='Target number of clues')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed, for reproducible output')
+    parser.add_argument('--attempts', type=int, default=1, help='Grids to try per puzzle when the target is missed')
+    parser.add_argument('--solutions', action='store_true', help='Write puzzle,solution lines')
+    cmdline = parser.parse_args()
+
+    rng = random.Random(cmdline.seed)
+    start = time.perf_counter()
+    for num in range(cmdline.count):
+        puzzle, solution = generate(cmdline.clues, rng=rng, attempts=cmdline.attempts)
+        line = "".join(str(value) for value in puzzle)
+        if cmdline.solutions:
+            line += "," + "".join(str(value) for value in solution)
+        print(line)
+    end = time.perf_counter()
+    print("Runtime: ", end - start, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
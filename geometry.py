@@ -0,0 +1,82 @@
+# Board geometry for every supported board order. A board of order n is made of n x n blocks of n x n cells, so it
+# has size = n * n rows, columns, blocks and digits and size * size cells: order 3 is the standard 9x9 board,
+# 4 is 16x16 and 5 is 25x25. Cells are indexed as row * size + col, candidate sets are Python ints used as
+# variable-width bitsets (bit d - 1 set for digit d). The tables of each order are built once, on first use
+
+ORDERS = [2, 3, 4, 5]  # 4x4 up to 25x25
+DEFAULT_ORDER = 3
+
+# Minimum number of clues for a uniquely solvable board. Only known for 9x9; other orders have no lower bound
+MIN_CLUES = {3: 17}
+
+
+class PopCount:  # bit count lookup for masks too wide for a table (a 25 digit table would have 2^25 entries)
+    def __getitem__(self, mask):
+        return bin(mask).count("1")
+
+
+class MaskDigits:  # sorted digits of a mask, for masks too wide for a table of tuples
+    def __getitem__(self, mask):
+        return tuple(digit for digit in range(1, mask.bit_length() + 1) if mask >> (digit - 1) & 1)
+
+
+class Geometry:
+    def __init__(self, order):
+        size = order * order
+        self.order = order
+        self.size = size
+        self.cells = size * size
+        self.all_digits = (1 << size) - 1
+        self.min_clues = MIN_CLUES.get(order, 0)
+        self.row_of = [ind // size for ind in range(self.cells)]
+        self.col_of = [ind % size for ind in range(self.cells)]
+        self.block_of = [(ind // (size * order)) * order + (ind % size) // order for ind in range(self.cells)]
+        # The units (rows, then columns, then blocks) as lists of cell indexes, and the peers of every cell
+        self.rows = [[row * size + col for col in range(size)] for row in range(size)]
+        self.cols = [[row * size + col for row in range(size)] for col in range(size)]
+        self.blocks = [[(block // order * order + pos // order) * size + block % order * order + pos % order
+                        for pos in range(size)] for block in range(size)]
+        self.units = self.rows + self.cols + self.blocks
+        self.peers = [sorted(set(self.rows[self.row_of[ind]] + self.cols[self.col_of[ind]] +
+                                 self.blocks[self.block_of[ind]]) - {ind}) for ind in range(self.cells)]
+        # Every block and row / column that cross as (the shared cells, the rest of the block, the rest of the
+        # line), for pointing / box-line reduction
+        self.block_lines = [([ind for ind in block if ind in line], [ind for ind in block if ind not in line],
+                             [ind for ind in line if ind not in block])
+                            for block in self.blocks for line in self.rows + self.cols if set(block) & set(line)]
+        self.peer_sets = [set(peers) for peers in self.peers]
+        self.bit_count = [bin(mask).count("1") for mask in range(self.all_digits + 1)] if size <= 16 else PopCount()
+        self.digits_of = [MaskDigits()[mask] for mask in range(self.all_digits + 1)] if size <= 9 else MaskDigits()
+        self.digit_of = {1 << (digit - 1): digit for digit in range(1, size + 1)}  # single bit -> its digit
+        # What bitmask_solver.search needs at every node, unpacked in one go (size + 1 is more candidates than any
+        # cell can have)
+        self.search_tables = (self.row_of, self.col_of, self.block_of, self.bit_count, self.digit_of, self.all_digits,
+                              size + 1)
+
+
+GEOMETRIES = {}
+ORDER_OF_CELLS = {order ** 4: order for order in ORDERS}
+
+
+def get_geometry(order=DEFAULT_ORDER):  # raises ValueError for an unsupported order
+    if order not in GEOMETRIES:
+        if order not in ORDERS:
+            raise ValueError("Unsupported board order: " + str(order) + " (choose from " +
+                             ", ".join(str(num) for num in ORDERS) + ")")
+        GEOMETRIES[order] = Geometry(order)
+    return GEOMETRIES[order]
+
+
+def order_of(num_cells):  # board order of a flat board with num_cells cells, None if no supported order fits
+    return ORDER_OF_CELLS.get(num_cells)
+
+
+def for_board(board):  # geometry of a flat board, from its length. Raises ValueError if no order fits. Called by the
+    # propagation techniques on every pass, so the common case is a single dict lookup
+    order = ORDER_OF_CELLS.get(len(board))
+    if order in GEOMETRIES:
+        return GEOMETRIES[order]
+    if order is None:
+        raise ValueError("A board must have " + ", ".join(str(cells) for cells in sorted(ORDER_OF_CELLS)) +
+                         " cells, not " + str(len(board)))
+    return get_geometry(order)
@@ -0,0 +1,24 @@
+# Production server settings, used by the Dockerfile: gunicorn --config gunicorn.conf.py app:app
+# Every setting can be overridden from the environment, e.g. WEB_CONCURRENCY=8 for more worker processes
+
+import multiprocessing
+import os
+import secrets
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "5000")
+
+# The app keeps no per-user state between requests, so it can run as several processes with a few threads each.
+# Solving itself happens in each worker's SolveRunner pool, the threads mostly wait on it
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count(), 4)))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 4))
+
+# Long enough for a solve that runs into SOLVE_TIME_LIMIT, so gunicorn doesn't kill the worker first
+timeout = int(float(os.environ.get("SOLVE_TIME_LIMIT", 10))) + 20
+
+accesslog = "-"
+
+# The workers are forked from this process and inherit its environment, so they all sign the difficulty
+# field with the same key even when none was configured
+if not os.environ.get("SECRET_KEY"):
+    os.environ["SECRET_KEY"] = secrets.token_hex(32)
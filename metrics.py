@@ -0,0 +1,69 @@
+# Solve metrics for the web app: counters fed with the SearchStats of every solve, rendered in the Prometheus text
+# format by /metrics, plus a log line for every solve slower than SLOW_SOLVE_SECONDS so the boards behind slow
+# requests can be looked at (and replayed) later
+# Counters are per server process; with several gunicorn workers every worker reports its own
+
+import logging
+import threading
+
+STATUS_NAMES = {-1: "no_solution", -2: "invalid", -3: "timeout"}
+
+logger = logging.getLogger("sudoku.solve")
+
+
+class SolveMetrics:
+    def __init__(self, slow_seconds=1.0):
+        self.slow_seconds = slow_seconds
+        self.lock = threading.Lock()
+        self.solves = {}  # result status -> count
+        self.solve_seconds = 0.0
+        self.nodes = 0
+        self.backtracks = 0
+        self.phase_seconds = {}
+        self.slow_solves = 0
+
+    def record(self, board, engine, solution, seconds, stats):  # stats is SearchStats.as_dict() or None
+        status = "solved" if solution[0] > 0 else STATUS_NAMES.get(solution[0], "error")
+        with self.lock:
+            self.solves[status] = self.solves.get(status, 0) + 1
+            self.solve_seconds += seconds
+            if stats is not None:
+                self.nodes += stats["nodes"]
+                self.backtracks += stats["backtracks"]
+                for phase, phase_seconds in stats["phase_times"].items():
+                    self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + phase_seconds
+            if seconds >= self.slow_seconds:
+                self.slow_solves += 1
+        if seconds >= self.slow_seconds:
+            board_str = "".join(str(value) for row in board for value in row)
+            if stats is None:
+                logger.warning("slow solve: %.3fs engine=%s status=%s board=%s", seconds, engine, status, board_str)
+            else:
+                logger.warning("slow solve: %.3fs engine=%s status=%s nodes=%d backtracks=%d phases=%s board=%s",
+                               seconds, engine, status, stats["nodes"], stats["backtracks"],
+                               {phase: round(value, 4) for phase, value in stats["phase_times"].items()}, board_str)
+
+    def render(self, gauges=None):  # Prometheus text format. gauges adds extra name -> value lines
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append("# HELP " + name + " " + help_text)
+            lines.append("# TYPE " + name + " " + kind)
+            for labels, value in samples:
+                lines.append(name + labels + " " + repr(value))
+
+        with self.lock:
+            metric("sudoku_solves_total", "counter", "Solves by result",
+                   [('{status="' + status + '"}', count) for status, count in sorted(self.solves.items())])
+            metric("sudoku_solve_seconds_total", "counter", "Wall time spent waiting on solves",
+                   [("", self.solve_seconds)])
+            metric("sudoku_search_nodes_total", "counter", "Search nodes visited", [("", self.nodes)])
+            metric("sudoku_search_backtracks_total", "counter", "Search nodes whose subtree had no solution",
+                   [("", self.backtracks)])
+            metric("sudoku_phase_seconds_total", "counter", "Solver time by phase",
+                   [('{phase="' + phase + '"}', value) for phase, value in sorted(self.phase_seconds.items())])
+            metric("sudoku_slow_solves_total", "counter", "Solves slower than the slow solve threshold",
+                   [("", self.slow_solves)])
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            metric(name, "gauge", help_text, [("", value)])
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,209 @@
+# Parallel search for a single hard board. The engines are single-threaded depth-first searches, so one very hard
+# board (or counting all the solutions of a sparse one) only ever gets one core. Here the board is propagated and
+# then split into subproblems by branching on its most constrained cells, MRV as in CSP.select_unassigned_var
+# (fewest candidates first). Every branch is propagated again and dropped if that shows it has no solution. The
+# subproblems are searched by the bitmask engine in a pool of worker processes. There are several times more
+# subproblems than workers and they sit in one shared queue, so a worker that finishes an easy subtree takes the
+# next one while another is still busy with a hard one.
+# First-solution mode returns the first solution any worker finds, count mode adds up the counts of the subtrees.
+# Either way, once the answer is known the other workers are told to stop through a shared event
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import bitmask_solver
+import geometry
+import propagation
+import puzzle_io
+import solvers
+from bitmask_solver import GRACE_PERIOD, SearchLimit, SolveTimeout
+
+PIECES_PER_WORKER = 8  # subproblems to split into per worker, enough to keep the workers busy until the end
+MAX_SPLIT_DEPTH = 6  # branching levels at most, the split itself runs in a single process
+
+STOPPED = "stopped"  # what a worker returns when it was told to stop or ran out of time
+
+STOP = None  # the stop event of the pool the worker process belongs to, set by init_worker
+
+
+def init_worker(stop):
+    global STOP
+    STOP = stop
+
+
+def most_constrained(board, cands, bit_count):  # the empty cell with the fewest candidates, None if there is none
+    best_ind = None
+    best_count = None
+    for ind in range(len(board)):
+        if board[ind] == 0 and (best_count is None or bit_count[cands[ind]] < best_count):
+            best_ind, best_count = ind, bit_count[cands[ind]]
+            if best_count == 2:  # propagation leaves no single candidates
+                break
+    return best_ind
+
+
+def branch(board, cands):  # the propagated boards of every candidate of the most constrained cell, without the ones
+    # propagation shows have no solution. Each is a (board, cands) pair
+    geo = geometry.for_board(board)
+    ind = most_constrained(board, cands, geo.bit_count)
+    children = []
+    for digit in geo.digits_of[cands[ind]]:
+        child_board, child_cands = list(board), list(cands)
+        propagation.place(child_board, child_cands, ind, digit)
+        if propagation.propagate(child_board, child_cands):
+            children.append((child_board, child_cands))
+    return children
+
+
+def split(board, pieces, max_depth=MAX_SPLIT_DEPTH):  # splits a flat board into subproblems, returns
+    # (solved boards, open boards). Branches a level at a time until there are at least pieces open boards or
+    # max_depth levels, so the open boards together cover the board's search space exactly once. Boards that
+    # propagation fills in completely on the way are solutions
+    board = list(board)
+    cands = propagation.initial_candidates(board)
+    if bitmask_solver.build_masks(board) is None or not propagation.propagate(board, cands):
+        return [], []
+    if 0 not in board:
+        return [board], []
+    solved = []
+    frontier = [(board, cands)]
+    for depth in range(max_depth):
+        if len(frontier) >= pieces:
+            break
+        next_frontier = []
+        for sub_board, sub_cands in frontier:
+            for child in branch(sub_board, sub_cands):
+                if 0 in child[0]:
+                    next_frontier.append(child)
+                else:
+                    solved.append(child[0])
+        frontier = next_frontier
+        if not frontier:
+            break
+    return solved, [sub_board for sub_board, sub_cands in frontier]
+
+
+def search_subtree(board, max_count, deadline):  # runs in a worker: the solution of a subproblem (None if it has
+    # none) or, with a max_count, how many solutions it has up to max_count. STOPPED if the search was stopped first
+    if STOP.is_set():  # the answer came in while this subproblem was waiting in the queue
+        return STOPPED
+    board = list(board)
+    geo = geometry.for_board(board)
+    rows, cols, blocks = bitmask_solver.build_masks(board, geo)
+    empties = [ind for ind in range(geo.cells) if board[ind] == 0]
+    limit = SearchLimit(deadline - time.perf_counter() if deadline is not None else None, STOP)
+    try:
+        if max_count is not None:
+            return bitmask_solver.count_search(board, empties, 0, rows, cols, blocks, max_count, limit, geo)
+        if bitmask_solver.search(board, empties, 0, rows, cols, blocks, limit, geo):
+            return board
+        return None
+    except SolveTimeout:
+        return STOPPED
+
+
+def run_pool(boards, workers, max_count, time_limit, enough):  # searches the boards in a pool of workers.
+    # enough(answer) is called with every subtree's answer as it comes in and returns True once that settles the
+    # result, the remaining workers are then stopped. Raises SolveTimeout if the time limit runs out first
+    if not boards:
+        return
+    stop = multiprocessing.Event()
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(stop,))
+    try:
+        pending = {executor.submit(search_subtree, board, max_count, deadline) for board in boards}
+        while pending:
+            timeout = max(deadline + GRACE_PERIOD - time.perf_counter(), 0) if deadline is not None else None
+            done, pending = wait(pending, timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                raise SolveTimeout()
+            for future in done:
+                answer = future.result()
+                if answer == STOPPED:  # nothing stops a worker before the answer is settled but its deadline
+                    raise SolveTimeout()
+                if enough(answer):
+                    return
+    finally:
+        stop.set()
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+def solve_board(board, workers=None, time_limit=None):  # solves a flat board in parallel, returns the solved flat
+    # list or None if there is no solution. workers defaults to the number of cores. Raises SolveTimeout if
+    # time_limit (seconds) runs out first
+    workers = workers or os.cpu_count()
+    solved, boards = split(board, workers * PIECES_PER_WORKER)
+    if solved:
+        return solved[0]
+    solutions = []
+
+    def enough(answer):
+        if answer is not None:
+            solutions.append(answer)
+        return bool(solutions)
+
+    run_pool(boards, workers, None, time_limit, enough)
+    return solutions[0] if solutions else None
+
+
+def count_solutions(board, limit=2, workers=None, time_limit=None):  # counts the solutions of a flat board in
+    # parallel, stopping once limit are found (limit=None counts them all). Raises SolveTimeout if time_limit
+    # (seconds) runs out first
+    workers = workers or os.cpu_count()
+    max_count = limit if limit is not None else float("inf")
+    solved, boards = split(board, workers * PIECES_PER_WORKER)
+    counts = [len(solved)]
+
+    def enough(answer):
+        counts.append(answer)
+        return sum(counts) >= max_count
+
+    if sum(counts) < max_count:
+        run_pool(boards, workers, max_count, time_limit, enough)
+    return min(sum(counts), max_count)
+
+
+def solve(input_arr, workers=None, time_limit=None):  # same contract as algorithm_revised.solve
+    return bitmask_solver.solve_with(solve_board, input_arr, workers, time_limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve the puzzles in a file one at a time, each split into '
+                                                 'subproblems that are searched by a pool of worker processes')
+    parser.add_argument('input', help='The input file (csv, one puzzle per line or grids), or - for stdin')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--time-limit', type=float, default=None, help='Seconds allowed per puzzle')
+    parser.add_argument('--count', action='store_true', help='Count the solutions of each puzzle instead')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='With --count, stop counting at this many solutions (default: count them all)')
+    parser.add_argument('--order', type=int, choices=geometry.ORDERS, default=geometry.DEFAULT_ORDER,
+                        help='Board order: 3 for 9x9 puzzles (default), 4 for 16x16, 5 for 25x25')
+    cmdline = parser.parse_args()
+
+    start = time.perf_counter()
+    for puzzle, solution in puzzle_io.read_puzzles(cmdline.input, order=cmdline.order):
+        board = puzzle_io.to_board(puzzle)
+        puzzle_start = time.perf_counter()
+        try:
+            if cmdline.count:
+                # Counting doesn't need the clue minimum, only a board without repeated digits
+                result = str(count_solutions(board, cmdline.limit, cmdline.workers, cmdline.time_limit))
+            elif not bitmask_solver.is_viable(board):
+                result = "-2"
+            else:
+                answer = solve_board(board, cmdline.workers, cmdline.time_limit)
+                result = puzzle_io.board_string(answer) if answer is not None else "-1"
+        except SolveTimeout:
+            result = solvers.TIMED_OUT if cmdline.count else "-3"
+        print(puzzle, result, round(time.perf_counter() - puzzle_start, 4))
+    print("Runtime: ", time.perf_counter() - start, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+# Portfolio solving: several strategies race on the same board, each in its own process. The first one to answer
+# wins and the others are terminated, so a board that is pathological for one engine costs about as much as the
+# engine that happens to be fast on it.
+# A strategy is an engine name from solvers.ENGINES ("bitmask", "dlx", "csp"), optionally with a seed
+# ("bitmask:7"). A seeded strategy randomizes the value ordering: the digits of the board are relabeled with a
+# random permutation before the search (the engines try candidates lowest digit first) and mapped back afterwards
+
+import argparse
+import multiprocessing
+import queue
+import random
+import sys
+import time
+
+import bitmask_solver
+import geometry
+import puzzle_io
+import solvers
+from bitmask_solver import GRACE_PERIOD, SolveTimeout
+
+DEFAULT_STRATEGIES = ["bitmask", "dlx", "csp", "bitmask:1", "bitmask:2", "dlx:1"]
+POLL_INTERVAL = 0.1  # seconds between checks for strategy processes that died without reporting
+
+# What a strategy process reports when it doesn't have an answer
+TIMED_OUT = "timeout"
+FAILED = "failed"
+
+
+def parse_strategy(strategy):  # "engine" or "engine:seed" -> (engine, seed or None). Raises ValueError
+    engine, sep, seed = strategy.partition(":")
+    solvers.get_engine(engine)
+    if sep and not seed.isdigit():
+        raise ValueError("Strategy seed must be a number: " + strategy)
+    return engine, int(seed) if sep else None
+
+
+def relabel(board, seed):  # returns the board with its digits permuted by a seeded random permutation, and the map
+    # from the new digits back to the original ones
+    size = geometry.for_board(board).size
+    digits = list(range(1, size + 1))
+    random.Random(seed).shuffle(digits)
+    original = {digits[digit - 1]: digit for digit in range(1, size + 1)}
+    return [digits[value - 1] if value else 0 for value in board], original
+
+
+def run_strategy(strategy, board, time_limit, limit):  # the answer of one strategy: the solution (or None) or,
+    # with a limit, the number of solutions found up to limit. Raises SolveTimeout
+    engine, seed = parse_strategy(strategy)
+    if limit is not None:  # relabeling digits doesn't change how many solutions there are
+        if seed is not None:
+            board = relabel(board, seed)[0]
+        return solvers.count_solutions(board, limit, engine, time_limit)
+    if seed is None:
+        return solvers.solve_board(board, engine, time_limit)
+    shuffled, original = relabel(board, seed)
+    solution = solvers.solve_board(shuffled, engine, time_limit)
+    return [original[value] for value in solution] if solution is not None else None
+
+
+def strategy_process(num, strategy, board, time_limit, limit, results):  # runs in a child process, puts
+    # (num, answer, error) on the results queue. Anything that went wrong is reported as FAILED with the error, so
+    # the race doesn't wait on it
+    error = None
+    try:
+        answer = run_strategy(strategy, board, time_limit, limit)
+    except SolveTimeout:
+        answer = TIMED_OUT
+    except Exception as exception:
+        answer, error = FAILED, repr(exception)
+    results.put((num, answer, error))
+
+
+def race(board, strategies=DEFAULT_STRATEGIES, time_limit=None, limit=None):
+    # Races the strategies on a flat board and returns (answer, winning strategy). The answer is the solution (None
+    # if the board has no solution) or, with a limit, the number of solutions found up to limit. Raises
+    # SolveTimeout if no strategy answers within time_limit seconds, RuntimeError if every strategy failed (raised
+    # an error or its process died) and ValueError for an unknown strategy
+    for strategy in strategies:
+        parse_strategy(strategy)
+    deadline = time.perf_counter() + time_limit + GRACE_PERIOD if time_limit is not None else None
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=strategy_process,
+                                         args=(num, strategy, board, time_limit, limit, results), daemon=True)
+                 for num, strategy in enumerate(strategies)]
+    for process in processes:
+        process.start()
+    try:
+        waiting = set(range(len(processes)))
+        failures = []
+        while waiting:
+            # Processes that had already exited before the queue turned out empty died without reporting
+            exited = [num for num in waiting if processes[num].exitcode is not None]
+            timeout = POLL_INTERVAL if deadline is None else min(max(deadline - time.perf_counter(), 0), POLL_INTERVAL)
+            try:
+                num, answer, error = results.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    raise SolveTimeout()
+                for num in exited:
+                    waiting.discard(num)
+                    failures.append(strategies[num] + ": exited with code " + str(processes[num].exitcode))
+                continue
+            waiting.discard(num)
+            if answer == FAILED:
+                failures.append(strategies[num] + ": " + error)
+            elif answer != TIMED_OUT:
+                return answer, strategies[num]
+        if len(failures) == len(strategies):
+            raise RuntimeError("Every strategy failed (" + "; ".join(failures) + ")")
+        raise SolveTimeout()
+    finally:
+        for process in processes:  # the losers are still searching, stop them
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+
+
+def solve_board(board, time_limit=None, strategies=DEFAULT_STRATEGIES):  # the solution of the race (None if the
+    # board has no solution), without the winner
+    return race(board, strategies, time_limit)[0]
+
+
+def solve(input_arr, time_limit=None, strategies=DEFAULT_STRATEGIES):  # same contract as algorithm_revised.solve.
+    # Raises RuntimeError if every strategy failed
+    return bitmask_solver.solve_with(solve_board, input_arr, time_limit, strategies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve every puzzle in a file by racing several engines / value '
+                                                 'orderings in parallel processes, printing the winner of each race')
+    parser.add_argument('input', help='The input file (csv, one puzzle per line or grids), or - for stdin')
+    parser.add_argument('--strategies', nargs='+', default=DEFAULT_STRATEGIES,
+                        help='Engines to race, engine:seed for a random value ordering (default: ' +
+                             ' '.join(DEFAULT_STRATEGIES) + ')')
+    parser.add_argument('--time-limit', type=float, default=None, help='Seconds allowed per puzzle')
+    parser.add_argument('--count', action='store_true',
+                        help='Race solution counters (stopping at two) to check each puzzle is unique instead')
+    parser.add_argument('--order', type=int, choices=geometry.ORDERS, default=geometry.DEFAULT_ORDER,
+                        help='Board order: 3 for 9x9 puzzles (default), 4 for 16x16, 5 for 25x25')
+    cmdline = parser.parse_args()
+
+    start = time.perf_counter()
+    wins = {}
+    for puzzle, solution in puzzle_io.read_puzzles(cmdline.input, order=cmdline.order):
+        board = puzzle_io.to_board(puzzle)
+        puzzle_start = time.perf_counter()
+        if not bitmask_solver.is_viable(board):
+            print(puzzle, solvers.INVALID if cmdline.count else "-2")
+            continue
+        try:
+            if cmdline.count:
+                count, winner = race(board, cmdline.strategies, cmdline.time_limit, limit=2)
+                result = solvers.uniqueness(count)
+            else:
+                answer, winner = race(board, cmdline.strategies, cmdline.time_limit)
+                result = puzzle_io.board_string(answer) if answer is not None else "-1"
+        except SolveTimeout:
+            result, winner = solvers.TIMED_OUT if cmdline.count else "-3", None
+        except RuntimeError as error:  # every strategy failed, which no result code stands for
+            result, winner = "failed", None
+            print(puzzle, error, file=sys.stderr)
+        wins[winner] = wins.get(winner, 0) + 1
+        print(puzzle, result, winner, round(time.perf_counter() - puzzle_start, 4))
+    for strategy in cmdline.strategies:
+        print(strategy + " won: ", wins.get(strategy, 0), file=sys.stderr)
+    print("Runtime: ", time.perf_counter() - start, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
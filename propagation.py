@@ -0,0 +1,196 @@
+# Constraint propagation with the techniques a human would use, on a flat board and a list of candidate masks
+# (bit n - 1 set while n can still go in the cell, 0 for filled cells). propagate() applies naked and hidden singles,
+# naked and hidden pairs and pointing / box-line reduction until none of them changes anything, which finishes most
+# real-world boards without any search. The engines run it before their search (and, optionally, at every node),
+# and rating.py uses the same techniques to rate boards
+# Every function works on boards of any order in geometry.ORDERS, taking the unit tables from the board's length
+
+import geometry
+
+# How much the engines propagate: not at all, once before the search, or at every search node
+OFF = "off"
+ROOT = "root"
+EVERY_NODE = "node"
+LEVELS = [OFF, ROOT, EVERY_NODE]
+
+
+def initial_candidates(board):  # candidate mask of every cell, 0 for filled cells
+    geo = geometry.for_board(board)
+    row_of, col_of, block_of = geo.row_of, geo.col_of, geo.block_of
+    rows = [0] * geo.size
+    cols = [0] * geo.size
+    blocks = [0] * geo.size
+    for ind in range(geo.cells):
+        if board[ind]:
+            bit = 1 << (board[ind] - 1)
+            rows[row_of[ind]] |= bit
+            cols[col_of[ind]] |= bit
+            blocks[block_of[ind]] |= bit
+    return [0 if board[ind] else ~(rows[row_of[ind]] | cols[col_of[ind]] | blocks[block_of[ind]]) & geo.all_digits
+            for ind in range(geo.cells)]
+
+
+def place(board, cands, ind, digit):  # fills a cell and removes the digit from the candidates of its peers
+    board[ind] = digit
+    cands[ind] = 0
+    keep = ~(1 << (digit - 1))
+    for peer in geometry.for_board(board).peers[ind]:
+        cands[peer] &= keep
+
+
+def eliminate(cands, cells, bits):  # removes bits from the candidates of cells, returns how many were removed
+    bit_count = geometry.for_board(cands).bit_count
+    removed = 0
+    for ind in cells:
+        if cands[ind] & bits:
+            removed += bit_count[cands[ind] & bits]
+            cands[ind] &= ~bits
+    return removed
+
+
+def has_dead_cell(board, cands):  # True if an empty cell has no candidate left
+    for cand, value in zip(cands, board):
+        if cand == 0 and value == 0:
+            return True
+    return False
+
+
+def is_broken(board, cands):  # True if an empty cell has no candidate left or a unit has no place left for a digit
+    if has_dead_cell(board, cands):
+        return True
+    geo = geometry.for_board(board)
+    for unit in geo.units:
+        seen = 0
+        for ind in unit:
+            seen |= cands[ind] | (1 << (board[ind] - 1) if board[ind] else 0)
+        if seen != geo.all_digits:
+            return True
+    return False
+
+
+# Every technique makes one pass over the board and returns how many placements or eliminations it made
+
+def naked_singles(board, cands):  # a cell with a single candidate left
+    geo = geometry.for_board(board)
+    bit_count, digit_of = geo.bit_count, geo.digit_of
+    placed = 0
+    for ind in range(geo.cells):
+        if board[ind] == 0 and bit_count[cands[ind]] == 1:
+            place(board, cands, ind, digit_of[cands[ind]])
+            placed += 1
+    return placed
+
+
+def hidden_singles(board, cands):  # a digit that fits in only one cell of a unit
+    geo = geometry.for_board(board)
+    placed = 0
+    for unit in geo.units:
+        once = twice = 0  # digits seen in at least one / at least two cells of the unit
+        for ind in unit:
+            twice |= once & cands[ind]
+            once |= cands[ind]
+        singles = once & ~twice
+        while singles:
+            bit = singles & -singles
+            singles ^= bit
+            for ind in unit:
+                if cands[ind] & bit:  # still there unless an earlier placement in this unit took it
+                    place(board, cands, ind, geo.digit_of[bit])
+                    placed += 1
+                    break
+    return placed
+
+
+def naked_pairs(board, cands):  # two cells of a unit with the same two candidates take them from the rest of the unit
+    geo = geometry.for_board(board)
+    bit_count = geo.bit_count
+    removed = 0
+    for unit in geo.units:
+        pairs = {}
+        for ind in unit:
+            if bit_count[cands[ind]] == 2:
+                pairs.setdefault(cands[ind], []).append(ind)
+        for mask, cells in pairs.items():
+            if len(cells) == 2:
+                removed += eliminate(cands, [ind for ind in unit if ind not in cells], mask)
+    return removed
+
+
+def hidden_pairs(board, cands):  # two digits that only fit in the same two cells of a unit: those cells can't hold
+    # anything else
+    geo = geometry.for_board(board)
+    bit_count = geo.bit_count
+    removed = 0
+    for unit in geo.units:
+        places = {}  # cells of the unit each digit fits in -> the digits with exactly those two cells
+        for digit in range(1, geo.size + 1):
+            bit = 1 << (digit - 1)
+            cells = tuple(ind for ind in unit if cands[ind] & bit)
+            if len(cells) == 2:
+                places[cells] = places.get(cells, 0) | bit
+        for cells, bits in places.items():
+            if bit_count[bits] == 2:
+                for ind in cells:
+                    if cands[ind] & ~bits:
+                        removed += bit_count[cands[ind] & ~bits]
+                        cands[ind] = bits
+    return removed
+
+
+def pointing(board, cands):  # a digit confined to one row / column inside a block is removed from the rest of that
+    # line, and a digit confined to one block inside a line is removed from the rest of that block
+    removed = 0
+    for shared, block_rest, line_rest in geometry.for_board(board).block_lines:
+        inside = block_outside = line_outside = 0
+        for ind in shared:
+            inside |= cands[ind]
+        for ind in block_rest:
+            block_outside |= cands[ind]
+        for ind in line_rest:
+            line_outside |= cands[ind]
+        if inside & ~block_outside & line_outside:  # confined to the line inside the block
+            removed += eliminate(cands, line_rest, inside & ~block_outside)
+        if inside & ~line_outside & block_outside:  # confined to the block inside the line
+            removed += eliminate(cands, block_rest, inside & ~line_outside)
+    return removed
+
+
+def x_wings(board, cands):  # a digit that fits in the same two columns of two rows is removed from the rest of
+    # those columns (and the same with rows and columns swapped)
+    geo = geometry.for_board(board)
+    removed = 0
+    for digit in range(1, geo.size + 1):
+        bit = 1 << (digit - 1)
+        for lines, cross_lines in ((geo.rows, geo.cols), (geo.cols, geo.rows)):
+            seen = {}
+            for line_num, line in enumerate(lines):
+                positions = tuple(pos for pos in range(geo.size) if cands[line[pos]] & bit)
+                if len(positions) != 2:
+                    continue
+                if positions in seen:
+                    other = seen[positions]
+                    for pos in positions:
+                        removed += eliminate(cands, [cross_lines[pos][num] for num in range(geo.size)
+                                                     if num not in (line_num, other)], bit)
+                else:
+                    seen[positions] = line_num
+    return removed
+
+
+# Techniques propagate() uses, cheapest first
+TECHNIQUES = [naked_singles, hidden_singles, naked_pairs, hidden_pairs, pointing]
+
+
+def propagate(board, cands, techniques=TECHNIQUES):
+    # Applies the cheapest technique that makes progress until none does, changing board and cands in place.
+    # Returns False if the board turned out to have no solution. Only dead cells are looked for after every step,
+    # the full is_broken check runs once propagation gets stuck (a board it fills in completely is always valid)
+    while 0 in board:
+        for technique in techniques:
+            if technique(board, cands):
+                break
+        else:
+            return not is_broken(board, cands)
+        if has_dead_cell(board, cands):
+            return False
+    return True
@@ -0,0 +1,181 @@
+# Streaming reader and writer for puzzle files
+# The reader accepts these formats, even mixed in one file:
+#   81 character lines, with 0 or . for blanks
+#   puzzle,solution csv lines (the Kaggle format), a csv header line is skipped
+#   9-line grids, one row of 9 cells per line, optionally separated by spaces or | (lines of - and + are skipped)
+# Lines starting with # and lines starting with a letter (headers, "Grid 01" titles) are skipped.
+# Larger boards (order 4 or 5, see geometry.py) are read with order=: their values 10 - 25 are written as the
+# letters A - P, so a 16x16 puzzle is a 256 character line and a grid row is 16 characters. Grid rows can also be
+# whitespace separated numbers ("0 12 16 ..."). Letters are cells on those boards, so only lines that don't read as
+# cells are skipped as headers.
+# Input is read in large binary blocks from a file, a memory-mapped file or stdin and boards are yielded one at a
+# time, so files of any size are processed in constant memory
+
+import contextlib
+import mmap
+import os
+import sys
+
+import geometry
+
+BLOCK_SIZE = 1 << 20  # bytes read at a time
+SEPARATORS = b" \t\r|+"  # removed from every line before it is parsed
+SYMBOLS = "0123456789ABCDEFGHIJKLMNOP"  # the character of every cell value, 0 for blanks
+CELL_CHARS = b"0123456789."
+
+
+def cell_chars(size):  # the characters a cell of a board with size digits can be written as
+    return CELL_CHARS[:size + 1] + b"." if size < 10 else CELL_CHARS + SYMBOLS[10:size + 1].encode("ascii")
+
+
+def to_board(puzzle):  # puzzle string (81 characters for 9x9) -> flat list of ints
+    return [int(char, 36) for char in puzzle]
+
+
+def to_grid(puzzle):  # puzzle string -> 2D list of ints (9x9 for 81 characters), the input of the solve() functions
+    board = to_board(puzzle)
+    size = geometry.for_board(board).size
+    return [board[row * size: row * size + size] for row in range(size)]
+
+
+def board_string(board):  # flat list, 2D list or sentinel list -> one character per cell (see SYMBOLS), or just the
+    # number for -1 / -2 / -3
+    if hasattr(board[0], "__len__"):
+        board = [value for row in board for value in row]
+    if board[0] < 0:
+        return str(board[0])
+    return "".join(SYMBOLS[value] for value in board)
+
+
+@contextlib.contextmanager
+def open_binary(path, use_mmap=False):  # "-" is stdin. With use_mmap the file is memory-mapped instead of read
+    if path == "-":
+        yield sys.stdin.buffer
+        return
+    with open(path, "rb") as file:
+        if use_mmap and os.fstat(file.fileno()).st_size > 0:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+        else:
+            yield file
+
+
+def read_lines(file, block_size=BLOCK_SIZE):  # yields the lines of a binary file (or mmap), read in big blocks
+    rest = b""
+    while True:
+        block = file.read(block_size)
+        if not block:
+            break
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()  # the last line may continue in the next block
+        for line in lines:
+            yield line
+    if rest:
+        yield rest
+
+
+def clean_cells(text, chars=CELL_CHARS):  # returns the text with separators removed and . turned into 0, or None if
+    # it has characters other than chars
+    text = text.translate(None, SEPARATORS)
+    if text.translate(None, chars):
+        return None
+    return text.replace(b".", b"0").decode("ascii")
+
+
+def number_row(line, size):  # a grid row written as whitespace separated numbers -> its cell characters, or None
+    fields = line.replace(b"|", b" ").split()
+    if len(fields) != size or not all(field.isdigit() and int(field) <= size for field in fields):
+        return None
+    return "".join(SYMBOLS[int(field)] for field in fields)
+
+
+def parse_lines(lines, errors="raise", order=geometry.DEFAULT_ORDER):
+    # Yields (puzzle, solution) pairs of strings with one character per cell (81 for the default 9x9 boards) from an
+    # iterable of byte lines; solution is None unless the line was puzzle,solution csv. Lines that can't be read
+    # raise ValueError, or with errors="keep" are yielded as (stripped line, None) so the caller can report them
+    geo = geometry.get_geometry(order)
+    size, num_cells = geo.size, geo.cells
+    chars = cell_chars(size)
+    grid_rows = []
+    for line_num, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line[:1] == b"#":
+            continue
+        if line[:1].isalpha() and (size < 10 or clean_cells(line.split(b",")[0], chars) is None):
+            continue
+        solution = None
+        if b"," in line:
+            fields = line.split(b",")
+            cells = clean_cells(fields[0], chars)
+            if len(fields) > 1:
+                solution = clean_cells(fields[1], chars)
+                if solution is not None and len(solution) != num_cells:
+                    solution = None  # e.g. a -1 / -2 result column
+        else:
+            if not line.strip(b"-+ \t|"):  # separator line of a drawn grid
+                continue
+            cells = (size > 9 and number_row(line, size)) or clean_cells(line, chars)
+
+        if cells is not None and len(cells) == size and solution is None:  # one row of a grid
+            grid_rows.append(cells)
+            if len(grid_rows) == size:
+                yield "".join(grid_rows), None
+                grid_rows = []
+            continue
+        if cells is not None and len(cells) == num_cells and not grid_rows:
+            yield cells, solution
+            continue
+        if errors != "keep":
+            raise ValueError("Line " + str(line_num) + " is not a puzzle: " + line[:100].decode("ascii", "replace"))
+        grid_rows = []
+        yield line.decode("ascii", "replace"), None
+    if grid_rows:
+        if errors != "keep":
+            raise ValueError("Input ends in the middle of a grid (" + str(len(grid_rows)) + " of " + str(size) +
+                             " rows)")
+        yield "".join(grid_rows), None
+
+
+def read_puzzles(path, use_mmap=False, errors="raise", order=geometry.DEFAULT_ORDER):  # yields (puzzle, solution)
+    # pairs from a file or "-"
+    with open_binary(path, use_mmap) as file:
+        for record in parse_lines(read_lines(file), errors, order):
+            yield record
+
+
+class PuzzleWriter:
+    # Writes results as they come in. Formats: "csv" (puzzle,solution with a header), "line" (just the solution)
+    # and "grid" (one line per row and a blank line). Unsolved results are written as their number (-1 / -2 / -3)
+    def __init__(self, path, fmt="csv", flush=False):
+        self.fmt = fmt
+        self.flush = flush  # flush after every result, for pipelines that consume the output while it is written
+        self.file = sys.stdout if path == "-" else open(path, "w")
+        if fmt == "csv":
+            self.file.write("puzzle,solution\n")
+
+    def write(self, puzzle, solution):  # puzzle as a string, solution as a string or a list of ints
+        if not isinstance(solution, str):
+            solution = board_string(solution)
+        if self.fmt == "csv":
+            self.file.write(puzzle + "," + solution + "\n")
+        elif self.fmt == "grid" and geometry.order_of(len(solution)):
+            size = geometry.order_of(len(solution)) ** 2
+            for row in range(size):
+                self.file.write(" ".join(solution[row * size: row * size + size]) + "\n")
+            self.file.write("\n")
+        else:
+            self.file.write(solution + "\n")
+        if self.flush:
+            self.file.flush()
+
+    def close(self):
+        if self.file is sys.stdout:
+            self.file.flush()
+        else:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,127 @@
+# Difficulty rating from how a board gets solved
+# The board is first worked on with the techniques a human would use (propagation.py), cheapest first: naked and
+# hidden singles, naked and hidden pairs, pointing / box-line reduction and X-wings. Whatever they can't finish is
+# handed to the bitmask search, which counts its nodes and backtracks. The label comes from the hardest technique
+# needed and from how much guessing was left, the score adds up all of it so boards with the same label can still be
+# ordered
+
+import argparse
+import sys
+import time
+
+import bitmask_solver
+import propagation
+import puzzle_io
+from bitmask_solver import SearchStats, SolveTimeout
+
+# Score for every use of a technique, and for every search node / backtrack
+TECHNIQUE_WEIGHTS = {"naked_single": 1, "hidden_single": 2, "naked_pair": 10, "hidden_pair": 12, "pointing": 12,
+                     "x_wing": 30}
+NODE_WEIGHT = 2
+BACKTRACK_WEIGHT = 20
+
+EXPERT_BACKTRACKS = 20  # boards that need more backtracks than this are Expert, fewer are Hard
+
+LABELS = {"Easy": "green", "Medium": "orange", "Hard": "red", "Expert": "purple", "N/A": "black"}
+NOT_RATED = ["N/A", LABELS["N/A"]]  # difficulty() of a board without a rating
+
+
+TECHNIQUES = [("naked_single", propagation.naked_singles), ("hidden_single", propagation.hidden_singles),
+              ("naked_pair", propagation.naked_pairs), ("hidden_pair", propagation.hidden_pairs),
+              ("pointing", propagation.pointing), ("x_wing", propagation.x_wings)]
+
+
+def apply_techniques(board, cands):  # applies the cheapest technique that makes progress until none does,
+    # returns how often each technique was used
+    used = {}
+    while 0 in board:
+        for name, technique in TECHNIQUES:
+            count = technique(board, cands)
+            if count:
+                used[name] = used.get(name, 0) + count
+                break
+        else:
+            break
+        if propagation.is_broken(board, cands):  # dead end, the board has no solution
+            break
+    return used
+
+
+def rate(board, time_limit=None):  # rates a flat list of 81 ints. Returns a dict with the label and its color,
+    # the score, the techniques used, and the search nodes / backtracks needed after them.
+    # Boards that are not viable or have no solution get the "N/A" label
+    rating = {"label": "N/A", "color": LABELS["N/A"], "score": 0, "techniques": {}, "nodes": 0, "backtracks": 0}
+    board = list(board)
+    if len(board) != 81 or not bitmask_solver.is_viable(board):
+        return rating
+    cands = propagation.initial_candidates(board)
+    used = apply_techniques(board, cands)
+    rating["techniques"] = used
+
+    nodes = backtracks = 0
+    if 0 in board:  # the techniques got stuck, the rest has to be searched
+        masks = bitmask_solver.build_masks(board)
+        if masks is None:
+            return rating
+        rows, cols, blocks = masks
+        empties = [ind for ind in range(81) if board[ind] == 0]
+        stats = SearchStats(time_limit)
+        try:
+            solved = bitmask_solver.search(board, empties, 0, rows, cols, blocks, stats)
+        except SolveTimeout:
+            solved = True  # too hard to finish in time, which is a rating of its own
+        if not solved:
+            return rating
+        stats.record_search(0, len(empties) + 1, solved)
+        nodes = stats.nodes
+        backtracks = stats.backtracks
+
+    score = sum(TECHNIQUE_WEIGHTS[name] * count for name, count in used.items())
+    score += NODE_WEIGHT * nodes + BACKTRACK_WEIGHT * backtracks
+    if backtracks > EXPERT_BACKTRACKS:
+        label = "Expert"
+    elif nodes or "x_wing" in used:
+        label = "Hard"
+    elif "naked_pair" in used or "hidden_pair" in used or "pointing" in used:
+        label = "Medium"
+    else:
+        label = "Easy"
+    rating.update({"label": label, "color": LABELS[label], "score": score, "nodes": nodes, "backtracks": backtracks})
+    return rating
+
+
+def difficulty(board, time_limit=None):  # [label, color] pair used by the web templates
+    rating = rate(board, time_limit)
+    return [rating["label"], rating["color"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rate the difficulty of every puzzle in a file (csv, 81 character '
+                                                 'lines or 9-line grids), writing puzzle,label,score lines')
+    parser.add_argument('input', help='The input file, or - for stdin')
+    parser.add_argument('output', help='The output csv file, or - for stdout')
+    parser.add_argument('--time-limit', type=float, default=None, help='Seconds of search allowed per puzzle')
+    cmdline = parser.parse_args()
+
+    out_file = sys.stdout if cmdline.output == "-" else open(cmdline.output, "w")
+    counts = {}
+    start = time.perf_counter()
+    try:
+        out_file.write("puzzle,difficulty,score\n")
+        for puzzle, solution in puzzle_io.read_puzzles(cmdline.input, errors="keep"):
+            board = puzzle_io.to_board(puzzle) if puzzle.isdigit() else []  # unreadable lines are rated N/A
+            rating = rate(board, cmdline.time_limit)
+            counts[rating["label"]] = counts.get(rating["label"], 0) + 1
+            out_file.write(puzzle + "," + rating["label"] + "," + str(rating["score"]) + "\n")
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+    end = time.perf_counter()
+    for label in LABELS:
+        if label in counts:
+            print(label + ": ", counts[label], file=sys.stderr)
+    print("Runtime: ", end - start, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# Result cache for solved puzzles, keyed by the board as a compact 81 character string ('0' for blanks)
+# An in-process LRU dict sits in front of an optional SQLite table, so repeat submissions of the same board
+# (e.g. the boards handed out by /generate_board) skip the solver entirely.
+# With canonical_keys=True a miss on the exact board is retried under the board's canonical form (canonical.py), so
+# relabeled, rotated or shuffled copies of a board share one cached solution. Only viable boards are canonicalized,
+# and one whose canonical form takes too long to find is cached under its exact key instead. Canonicalizing takes tens
+# of milliseconds, so the app hands it to its worker pool (SolveRunner.canonicalize) instead of the request thread
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import bitmask_solver
+import canonical
+
+CANONICAL_TIME_LIMIT = 0.25  # seconds that may be spent canonicalizing a board
+
+
+def board_key(board):  # 81 character string for a flat list or a 9x9 list of ints
+    if len(board) == 9:
+        board = [value for row in board for value in row]
+    return "".join(str(value) for value in board)
+
+
+def encode_solution(solution):  # solutions are stored as 81 digits, the -1 / -2 sentinels as just the number
+    if solution[0] < 0:
+        return str(solution[0])
+    return "".join(str(value) for value in solution)
+
+
+def decode_solution(text):
+    if text.startswith("-"):
+        return [int(text)] * 81
+    return [int(char) for char in text]
+
+
+def canonicalize_here(board, time_limit):  # default canonicalizer of a SolutionCache, runs in the calling thread
+    return canonical.canonicalize(board, time_limit=time_limit)
+
+
+class SolutionCache:
+    def __init__(self, max_size=10000, db_path=None, canonical_keys=False, canonical_time_limit=CANONICAL_TIME_LIMIT,
+                 canonicalize=canonicalize_here):
+        self.max_size = max_size  # number of boards kept in memory, least recently used ones are evicted first
+        self.canonical_keys = canonical_keys
+        self.canonical_time_limit = canonical_time_limit
+        # canonicalize(board, time_limit) -> (canonical board, transform), or None if it wasn't found in time
+        self.canonicalize = canonicalize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.canonical_hits = 0  # hits that were found under the board's canonical form rather than the board itself
+        self.lock = threading.Lock()  # the Flask server may handle requests on several threads
+        self.db = None
+        if db_path is not None:  # optional on-disk layer that survives restarts and is shared between workers
+            self.db = sqlite3.connect(db_path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions (puzzle TEXT PRIMARY KEY, solution TEXT NOT NULL)")
+            self.db.commit()
+
+    def get(self, key):  # returns the cached solution list or None
+        solution = self.lookup(key)
+        self.count(solution is not None)
+        return solution
+
+    def lookup(self, key):  # get without counting a hit or a miss
+        with self.lock:
+            text = self.entries.get(key)
+            if text is not None:
+                self.entries.move_to_end(key)
+            elif self.db is not None:
+                row = self.db.execute("SELECT solution FROM solutions WHERE puzzle = ?", (key,)).fetchone()
+                if row is not None:
+                    text = row[0]
+                    self.remember(key, text)
+        if text is None:
+            return None
+        return decode_solution(text)
+
+    def count(self, hit, canonical_hit=False):
+        with self.lock:
+            if hit:
+                self.hits += 1
+                if canonical_hit:
+                    self.canonical_hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, solution):
+        if solution[0] == -3:  # a timed out solve says nothing about the board, so it is never cached
+            return
+        text = encode_solution(solution)
+        with self.lock:
+            self.remember(key, text)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO solutions (puzzle, solution) VALUES (?, ?)", (key, text))
+                self.db.commit()
+
+    def remember(self, key, text):  # adds to the in-memory LRU, caller holds the lock
+        self.entries[key] = text
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def solve(self, input_arr, solver):  # returns solver(input_arr), reusing the cached result when there is one.
+        # Counts one hit or one miss, and a solve adds one entry: under the canonical key if the board has one
+        key = board_key(input_arr)
+        solution = self.lookup(key)
+        if solution is not None:
+            self.count(True)
+            return solution
+        canonical_form = None
+        if self.canonical_keys and len(key) == 81 and key.isdigit():  # only well-formed boards are canonicalized
+            board = [int(char) for char in key]
+            if bitmask_solver.is_viable(board):  # answered at once by the solver, and few clues make many ties
+                canonical_form = self.canonicalize(board, self.canonical_time_limit)
+        if canonical_form is not None:
+            canonical_board, transform = canonical_form
+            key = board_key(canonical_board)
+            solution = self.lookup(key)
+            if solution is not None:
+                self.count(True, canonical_hit=True)
+                if solution[0] < 0:  # sentinels (-1 / -2) are the same in every frame
+                    return solution
+                return canonical.invert_transform(solution, transform)
+        self.count(False)
+        solution = solver(input_arr)
+        if canonical_form is not None and solution[0] > 0:
+            self.put(key, canonical.apply_transform(solution, transform))
+        else:
+            self.put(key, solution)
+        return solution
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "canonical_hits": self.canonical_hits,
+                    "size": len(self.entries), "max_size": self.max_size}
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,199 @@
+# Runs solves for the web app in a bounded pool of worker processes with a per-request deadline
+# The engines check their time limit every few thousand search nodes (cooperative cancellation) and give up with
+# [-3] * 81, so one adversarial board can't pin a worker or a Flask thread. If a request can't even get a worker
+# before its deadline it is cancelled and also reported as timed out
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, TimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import bitmask_solver
+import canonical
+import rating
+import solvers
+from bitmask_solver import GRACE_PERIOD, SearchStats, SolveTimeout
+
+
+def solve_with_stats(input_arr, engine, time_limit):  # runs in a worker process, returns the solution and the
+    # search statistics (SearchStats.as_dict()) of the solve
+    stats = SearchStats()
+    solution = solvers.solve(input_arr, engine, time_limit, stats)
+    return solution, stats.as_dict()
+
+
+def solve_and_check(input_arr, engine, time_limit, rating_time_limit, solution=None):  # runs in a worker process:
+    # solves the board unless its solution is already known, then counts up to two solutions in what is left of
+    # time_limit and rates it (rating.difficulty). Returns the solution, the search statistics of the solve (None if
+    # it didn't solve), the check_uniqueness result and the difficulty, or None and N/A for a board without solution
+    start = time.perf_counter()
+    stats = None
+    if solution is None:
+        solution, stats = solve_with_stats(input_arr, engine, time_limit)
+    if solution[0] < 0:
+        return solution, stats, None, rating.NOT_RATED
+    board = bitmask_solver.flatten(input_arr)
+    try:
+        count = solvers.count_solutions(board, 2, engine, max(time_limit - (time.perf_counter() - start), 0))
+        uniqueness = solvers.uniqueness(count)
+    except SolveTimeout:
+        uniqueness = solvers.TIMED_OUT
+    return solution, stats, uniqueness, rating.difficulty(board, rating_time_limit)
+
+
+class SolveRunner:
+    def __init__(self, max_workers=None, time_limit=10.0, engine=solvers.DEFAULT_ENGINE, metrics=None,
+                 batch_time_limit=60.0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.time_limit = time_limit  # default per-request deadline in seconds
+        self.batch_time_limit = batch_time_limit  # deadline in seconds of a whole solve_many batch
+        # Boards one batch may have in the pool at once. One worker is left for single solves, which would
+        # otherwise queue behind the whole batch
+        self.batch_workers = max(self.max_workers - 1, 1)
+        self.engine = engine
+        self.metrics = metrics  # optional metrics.SolveMetrics, fed with the stats of every solve
+        self.executor = None  # created on first use, so importing the app doesn't fork workers
+        self.lock = threading.Lock()
+        self.timeouts = 0
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self.executor
+
+    def restart(self):  # replaces a pool whose worker died
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def submit(self, func, *args):
+        try:
+            return self.get_executor().submit(func, *args)
+        except BrokenProcessPool:
+            self.restart()
+            return self.get_executor().submit(func, *args)
+
+    def solve(self, input_arr, time_limit=None, engine=None):  # same contract as algorithm_revised.solve,
+        # [-3] * 81 on timeout
+        time_limit = time_limit if time_limit is not None else self.time_limit
+        engine = engine or self.engine
+        start = time.perf_counter()
+        future = self.submit(solve_with_stats, input_arr, engine, time_limit)
+        try:
+            solution, stats = future.result(timeout=time_limit + GRACE_PERIOD)
+        except TimeoutError:
+            future.cancel()  # drops the solve if it is still waiting for a worker
+            solution, stats = self.timed_out(), None
+        except BrokenProcessPool:
+            self.restart()
+            solution, stats = self.timed_out(), None
+        if self.metrics is not None:
+            self.metrics.record(input_arr, engine, solution, time.perf_counter() - start, stats)
+        return solution
+
+    def check(self, input_arr, time_limit=None, engine=None):  # solvers.check_uniqueness in the pool, with the
+        # same deadline as a solve: "unique", "multiple", "none", "invalid" or "timeout"
+        time_limit = time_limit if time_limit is not None else self.time_limit
+        future = self.submit(solvers.check_uniqueness, input_arr, engine or self.engine, time_limit)
+        try:
+            return future.result(timeout=time_limit + GRACE_PERIOD)
+        except TimeoutError:
+            future.cancel()
+        except BrokenProcessPool:
+            self.restart()
+        self.timed_out()
+        return solvers.TIMED_OUT
+
+    def canonicalize(self, board, time_limit):  # canonical.canonicalize of a flat board in the pool, so the
+        # request thread only waits on it. None if it isn't found within time_limit
+        future = self.submit(canonical.canonicalize, board, canonical.MAX_CANDIDATES, time_limit)
+        try:
+            return future.result(timeout=time_limit + GRACE_PERIOD)
+        except TimeoutError:
+            future.cancel()
+        except BrokenProcessPool:
+            self.restart()
+        return None
+
+    def solve_checked(self, input_arr, rating_time_limit, solution=None, time_limit=None, engine=None):  # solve,
+        # check and rate in one worker job (solve_and_check), returns (solution, uniqueness, difficulty). time_limit
+        # bounds the solve and the check together, rating_time_limit the rating
+        if solution is not None and solution[0] < 0:
+            return solution, None, rating.NOT_RATED
+        time_limit = time_limit if time_limit is not None else self.time_limit
+        engine = engine or self.engine
+        start = time.perf_counter()
+        future = self.submit(solve_and_check, input_arr, engine, time_limit, rating_time_limit, solution)
+        checked = None
+        try:
+            checked = future.result(timeout=time_limit + rating_time_limit + GRACE_PERIOD)
+        except TimeoutError:
+            future.cancel()
+        except BrokenProcessPool:
+            self.restart()
+        if checked is None:  # a solution found earlier still stands, only the check and the rating are lost
+            timed_out = self.timed_out()
+            checked = (solution if solution is not None else timed_out, None, solvers.TIMED_OUT, rating.NOT_RATED)
+        checked_solution, stats, uniqueness, difficulty = checked
+        if solution is None and self.metrics is not None:
+            self.metrics.record(input_arr, engine, checked_solution, time.perf_counter() - start, stats)
+        return checked_solution, uniqueness, difficulty
+
+    def timed_out(self):
+        with self.lock:
+            self.timeouts += 1
+        return [-3] * 81
+
+    def solve_many(self, boards, time_limit=None, engine=None):  # solves a list of 2D boards across the pool,
+        # returns their results in the same order. time_limit applies to each board. At most batch_workers boards
+        # are handed to the pool at a time, and boards not solved within batch_time_limit are timed out
+        time_limit = time_limit if time_limit is not None else self.time_limit
+        engine = engine or self.engine
+        start = time.perf_counter()
+        deadline = start + self.batch_time_limit
+        results = [None] * len(boards)
+        running = {}  # future -> position of its board
+        next_pos = 0
+        while next_pos < len(boards) or running:
+            while next_pos < len(boards) and len(running) < self.batch_workers:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                # no board may keep its worker busy past the end of the batch
+                running[self.submit(solve_with_stats, boards[next_pos], engine, min(time_limit, remaining))] = next_pos
+                next_pos += 1
+            if not running:
+                break
+            done = wait(running, max(deadline + GRACE_PERIOD - time.perf_counter(), 0), FIRST_COMPLETED)[0]
+            if not done:
+                break
+            for future in done:
+                pos = running.pop(future)
+                try:
+                    solution, stats = future.result()
+                except BrokenProcessPool:
+                    self.restart()
+                    solution, stats = self.timed_out(), None
+                self.record_batch(boards[pos], engine, solution, start, stats)
+                results[pos] = solution
+        for future in running:  # still running at the deadline
+            future.cancel()
+        for pos in range(len(boards)):  # unfinished or never handed to the pool
+            if results[pos] is None:
+                results[pos] = self.timed_out()
+                self.record_batch(boards[pos], engine, results[pos], start, None)
+        return results
+
+    def record_batch(self, input_arr, engine, solution, start, stats):  # the wall time of a batch solve includes
+        # its wait for a free worker
+        if self.metrics is not None:
+            self.metrics.record(input_arr, engine, solution, time.perf_counter() - start, stats)
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            self.executor = None
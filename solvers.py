@@ -0,0 +1,63 @@
+# Common interface over the solver engines
+# Every engine module provides solve_board(board, time_limit) (flat list of ints in, solved flat list or None out),
+# count_solutions(board, limit, time_limit) and solve(input_arr, time_limit) with the same contract as
+# algorithm_revised.solve. Boards can be 9x9, 16x16 or 25x25 (see geometry.py), the order comes from their size.
+# With a time_limit, solve returns all -3 and the others raise
+# bitmask_solver.SolveTimeout once the limit has passed. All of them take an optional bitmask_solver.SearchStats
+# as stats= to count search nodes, backtracks and time per phase
+# check_uniqueness runs any engine as a solution counter that stops at two and reports whether a board is a proper
+# puzzle (exactly one solution)
+
+import bitmask_solver
+import csp_solver
+import dlx_solver
+from bitmask_solver import SolveTimeout
+
+ENGINES = {
+    "bitmask": bitmask_solver,  # most-constrained-cell backtracking on row/column/block bitmasks
+    "dlx": dlx_solver,  # Dancing Links exact cover, predictable on sparse 17-clue boards
+    "csp": csp_solver,  # algorithm.py's CSP: AC-3, MRV / degree heuristics and forward checking
+}
+DEFAULT_ENGINE = "bitmask"
+
+# Results of check_uniqueness
+UNIQUE = "unique"
+MULTIPLE = "multiple"
+NO_SOLUTION = "none"
+INVALID = "invalid"  # not viable: fewer than 17 clues or a repeated digit in a unit
+TIMED_OUT = "timeout"
+
+
+def get_engine(name=DEFAULT_ENGINE):
+    if name not in ENGINES:
+        raise ValueError("Unknown solver engine: " + str(name) + " (choose from " + ", ".join(ENGINES) + ")")
+    return ENGINES[name]
+
+
+def solve(input_arr, engine=DEFAULT_ENGINE, time_limit=None, stats=None):
+    return get_engine(engine).solve(input_arr, time_limit, stats)
+
+
+def solve_board(board, engine=DEFAULT_ENGINE, time_limit=None, stats=None):
+    return get_engine(engine).solve_board(board, time_limit, stats)
+
+
+def count_solutions(board, limit=2, engine=DEFAULT_ENGINE, time_limit=None, stats=None):
+    return get_engine(engine).count_solutions(board, limit, time_limit, stats)
+
+
+def uniqueness(count):  # check_uniqueness result for the count of a solution counter that stopped at two
+    if count == 0:
+        return NO_SOLUTION
+    return UNIQUE if count == 1 else MULTIPLE
+
+
+def check_uniqueness(input_arr, engine=DEFAULT_ENGINE, time_limit=None, stats=None):  # 2D board in, one of the
+    # results above out. Only counts up to two solutions, so it is about as fast as a solve on proper puzzles
+    board = bitmask_solver.flatten(input_arr)
+    if not bitmask_solver.is_viable(board):
+        return INVALID
+    try:
+        return uniqueness(count_solutions(board, 2, engine, time_limit, stats))
+    except SolveTimeout:
+        return TIMED_OUT
@@ -0,0 +1,61 @@
+# Tests for the JSON API's board parsing in app.py and for the single worker job (solve_runner.solve_and_check) that
+# solves, checks and rates a board typed into the /solve page. Run with python -m unittest (or pytest)
+
+import unittest
+
+import app
+import benchmark
+import rating
+import solve_runner
+import solvers
+
+
+class ParseBoardTest(unittest.TestCase):
+    def test_accepts_boards(self):
+        grid = [[0] * 9 for row in range(9)]
+        grid[0][0] = 5
+        self.assertEqual(app.parse_board("5" + "." * 80), grid)
+        self.assertEqual(app.parse_board([5] + [0] * 80), grid)
+        self.assertEqual(app.parse_board(grid), grid)
+
+    def test_rejects_values(self):
+        for value in [2 ** 70, 265, 10, -1, 1.7, True, "5", None]:
+            with self.subTest(value=value):
+                self.assertIsNone(app.parse_board([value] + [0] * 80))
+        self.assertIsNone(app.parse_board("x" + "0" * 80))
+        self.assertIsNone(app.parse_board("0" * 80))
+
+    def test_api_rejects_out_of_range_cells(self):
+        client = app.app.test_client()
+        for value in [2 ** 70, 265]:
+            with self.subTest(value=value):
+                response = client.post("/api/solve", json={"board": [value] + [0] * 80})
+                self.assertEqual(response.status_code, 400)
+
+
+class SolveAndCheckTest(unittest.TestCase):
+    def setUp(self):
+        self.puzzle, self.solution = benchmark.load_set("easy")[0]
+
+    def solve_and_check(self, board, solution=None):
+        return solve_runner.solve_and_check(benchmark.to_grid(board), solvers.DEFAULT_ENGINE, 10.0, 0.5, solution)
+
+    def test_unique(self):
+        solution, stats, uniqueness, difficulty = self.solve_and_check(self.puzzle)
+        self.assertEqual((solution, uniqueness), (self.solution, solvers.UNIQUE))
+        self.assertIsNotNone(stats)
+        self.assertIn(difficulty[0], rating.LABELS)
+
+    def test_multiple(self):
+        clues = [ind for ind in range(81) if self.puzzle[ind]][:17]
+        board = [self.puzzle[ind] if ind in clues else 0 for ind in range(81)]
+        self.assertEqual(self.solve_and_check(board)[2], solvers.MULTIPLE)
+
+    def test_known_solution(self):  # a cached solution is only checked and rated
+        solution, stats, uniqueness, difficulty = self.solve_and_check(self.puzzle, self.solution)
+        self.assertEqual((solution, stats, uniqueness), (self.solution, None, solvers.UNIQUE))
+        self.assertEqual(self.solve_and_check(self.puzzle, [-1] * 81)[2:], (None, rating.NOT_RATED))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+# Tests for solution_cache.py: a lookup counts one hit or one miss, a solve stores one entry, and symmetric copies
+# of a board are answered from the entry of the first one. Run with python -m unittest (or pytest)
+
+import unittest
+
+import benchmark
+import bitmask_solver
+from solution_cache import SolutionCache
+
+
+def transposed(board):  # a 2D board mirrored along its main diagonal
+    return [list(row) for row in zip(*board)]
+
+
+class SolutionCacheTest(unittest.TestCase):
+    def setUp(self):
+        puzzle, self.solution = benchmark.load_set("easy")[0]
+        self.board = benchmark.to_grid(puzzle)
+        self.solves = []
+        self.cache = SolutionCache(canonical_keys=True)
+
+    def solver(self, input_arr):
+        self.solves.append(input_arr)
+        return bitmask_solver.solve(input_arr)
+
+    def test_one_entry_and_one_miss_per_solve(self):
+        self.assertEqual(self.cache.solve(self.board, self.solver), self.solution)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (0, 1, 1))
+        self.assertEqual(self.cache.solve(self.board, self.solver), self.solution)
+        self.assertEqual(len(self.solves), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_symmetric_copy(self):
+        self.cache.solve(self.board, self.solver)
+        expected = [value for row in transposed(benchmark.to_grid(self.solution)) for value in row]
+        self.assertEqual(self.cache.solve(transposed(self.board), self.solver), expected)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["canonical_hits"], stats["misses"], stats["size"]), (1, 1, 1, 1))
+        self.assertEqual(len(self.solves), 1)
+
+    def test_sentinels(self):
+        repeated = [[5, 5] + [0] * 7] + [[0] * 9 for row in range(8)]
+        self.assertEqual(self.cache.solve(repeated, self.solver), [-2] * 81)
+        self.assertEqual(self.cache.solve(repeated, self.solver), [-2] * 81)
+        self.assertEqual(len(self.solves), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# Conformance tests for the engines in solvers.ENGINES: every engine, and the bitmask / CSP engines at every
+# propagation level, has to agree on the fixed corpus (runtime_test/corpus) and on boards with no solution or more
+# than one. Run with python -m unittest (or pytest)
+
+import unittest
+from functools import partial
+
+import algorithm
+import benchmark
+import bitmask_solver
+import csp_solver
+import geometry
+import propagation
+import solvers
+
+TIME_LIMIT = 30.0  # seconds per board, only there so a broken engine fails instead of hanging the run
+
+# Every way to solve a flat board: name -> solve_board(board, time_limit)
+SOLVE_BOARD = {engine: partial(solvers.solve_board, engine=engine) for engine in solvers.ENGINES}
+for level in propagation.LEVELS:
+    SOLVE_BOARD["bitmask_" + level] = partial(bitmask_solver.solve_board, propagate=level)
+    SOLVE_BOARD["csp_" + level] = partial(csp_solver.solve_board, propagate=level)
+
+# Every way to count the solutions of a flat board: name -> count_solutions(board, limit, time_limit)
+COUNT_SOLUTIONS = {engine: partial(solvers.count_solutions, engine=engine) for engine in solvers.ENGINES}
+for level in propagation.LEVELS:
+    COUNT_SOLUTIONS["bitmask_" + level] = partial(bitmask_solver.count_solutions, propagate=level)
+    COUNT_SOLUTIONS["csp_" + level] = partial(lambda board, limit, time_limit, level: algorithm.count_solutions(
+        csp_solver.to_grid(board), limit, time_limit, propagate=level), level=level)
+
+# A 4x4 board with no solution whose contradiction shows up before any search (one of its empty cells has no
+# candidate left), and the empty 4x4 board, which has 288 solutions
+DEAD_CELL_BOARD = [1, 0, 0, 3, 2, 0, 0, 0, 0, 0, 3, 0, 0, 4, 0, 0]
+EMPTY_BOARD_SOLUTIONS = 288
+
+
+def is_solution(solution, board):  # True if solution is a filled, valid board that keeps every clue of board
+    if solution is None or len(solution) != len(board) or 0 in solution:
+        return False
+    if any(clue and clue != value for clue, value in zip(board, solution)):
+        return False
+    geo = geometry.for_board(board)
+    return all(sorted(solution[ind] for ind in unit) == list(range(1, geo.size + 1)) for unit in geo.units)
+
+
+def wrong_clue(puzzle, solution):  # the puzzle with one more clue that doesn't repeat a digit in any unit but
+    # differs from the (unique) solution, so the board has no solution
+    geo = geometry.for_board(puzzle)
+    for ind in range(geo.cells):
+        if puzzle[ind] == 0:
+            for digit in range(1, geo.size + 1):
+                board = list(puzzle)
+                board[ind] = digit
+                if digit != solution[ind] and bitmask_solver.build_masks(board) is not None:
+                    return board
+    return None
+
+
+def two_solutions(solution):  # a solved 9x9 board with the four cells of a "deadly rectangle" emptied: two rows of
+    # one band and two columns of different stacks whose corners hold a b / b a. The digits can be swapped, so the
+    # board has exactly two solutions. None if the solution has no such rectangle
+    for row1 in range(9):
+        for row2 in range(row1 + 1, row1 // 3 * 3 + 3):
+            for col1 in range(9):
+                for col2 in range(col1 // 3 * 3 + 3, 9):
+                    if solution[row1 * 9 + col1] == solution[row2 * 9 + col2] and \
+                            solution[row1 * 9 + col2] == solution[row2 * 9 + col1]:
+                        board = list(solution)
+                        for ind in (row1 * 9 + col1, row1 * 9 + col2, row2 * 9 + col1, row2 * 9 + col2):
+                            board[ind] = 0
+                        return board
+    return None
+
+
+class CorpusTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pairs = [pair for name in benchmark.CORPUS_SETS for pair in benchmark.load_set(name)]
+
+    def test_solves_corpus(self):
+        for name, solve_board in SOLVE_BOARD.items():
+            for puzzle, solution in self.pairs:
+                with self.subTest(solver=name, puzzle=puzzle):
+                    self.assertEqual(solve_board(puzzle, time_limit=TIME_LIMIT), solution)
+
+    def test_counts_one_solution(self):
+        for name, count_solutions in COUNT_SOLUTIONS.items():
+            for puzzle, solution in self.pairs:
+                with self.subTest(counter=name, puzzle=puzzle):
+                    self.assertEqual(count_solutions(puzzle, 2, time_limit=TIME_LIMIT), 1)
+
+    def test_no_solution(self):
+        boards = [wrong_clue(puzzle, solution) for puzzle, solution in self.pairs] + [DEAD_CELL_BOARD]
+        for board in boards:
+            for name, solve_board in SOLVE_BOARD.items():
+                with self.subTest(solver=name, board=board):
+                    self.assertIsNone(solve_board(board, time_limit=TIME_LIMIT))
+            for name, count_solutions in COUNT_SOLUTIONS.items():
+                with self.subTest(counter=name, board=board):
+                    self.assertEqual(count_solutions(board, 2, time_limit=TIME_LIMIT), 0)
+
+    def test_two_solutions(self):
+        boards = [board for board in (two_solutions(solution) for puzzle, solution in self.pairs) if board]
+        self.assertTrue(boards)
+        for board in boards:
+            for name, solve_board in SOLVE_BOARD.items():
+                with self.subTest(solver=name, board=board):
+                    self.assertTrue(is_solution(solve_board(board, time_limit=TIME_LIMIT), board))
+            for name, count_solutions in COUNT_SOLUTIONS.items():
+                with self.subTest(counter=name, board=board):
+                    self.assertEqual(count_solutions(board, 2, time_limit=TIME_LIMIT), 2)
+                    self.assertEqual(count_solutions(board, 10, time_limit=TIME_LIMIT), 2)
+
+    def test_too_few_clues(self):  # not viable, but counting only needs a board without repeated digits
+        puzzle = self.pairs[0][0]
+        clues = [ind for ind in range(len(puzzle)) if puzzle[ind]][:16]
+        board = [puzzle[ind] if ind in clues else 0 for ind in range(len(puzzle))]
+        self.assertFalse(bitmask_solver.is_viable(board))
+        for name, count_solutions in COUNT_SOLUTIONS.items():
+            with self.subTest(counter=name):
+                self.assertEqual(count_solutions(board, 2, time_limit=TIME_LIMIT), 2)
+
+    def test_empty_board(self):
+        for name, solve_board in SOLVE_BOARD.items():
+            with self.subTest(solver=name):
+                self.assertTrue(is_solution(solve_board([0] * 16, time_limit=TIME_LIMIT), [0] * 16))
+        for name, count_solutions in COUNT_SOLUTIONS.items():
+            with self.subTest(counter=name):
+                self.assertEqual(count_solutions([0] * 16, 1000, time_limit=TIME_LIMIT), EMPTY_BOARD_SOLUTIONS)
+
+
+class SolveContractTest(unittest.TestCase):  # solve() of every engine: 2D board in, flat list or sentinels out
+    def test_sentinels(self):
+        puzzle, solution = benchmark.load_set("easy")[0]
+        repeated = [[5, 5] + [0] * 7] + [[0] * 9 for row in range(8)]
+        for engine in solvers.ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(solvers.solve(benchmark.to_grid(puzzle), engine), solution)
+                self.assertEqual(solvers.solve(repeated, engine), [-2] * 81)
+                self.assertEqual(solvers.solve(csp_solver.to_grid(DEAD_CELL_BOARD), engine), [-1] * 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
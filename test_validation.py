@@ -0,0 +1,48 @@
+# Tests for validation.py: the numPy batch checks have to agree with bitmask_solver.is_viable, also on values that
+# don't fit the int8 arrays they work on. Run with python -m unittest (or pytest)
+
+import unittest
+
+import numpy as np
+
+import benchmark
+import bitmask_solver
+import validation
+
+
+class ValidateBatchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pairs = benchmark.load_set("easy")
+
+    def test_agrees_with_is_viable(self):
+        boards = [puzzle for puzzle, solution in self.pairs]
+        boards.append([5, 5] + boards[0][2:])
+        boards.append([value if pos % 2 else 0 for pos, value in enumerate(boards[0])])  # too few clues
+        valid, conflicts = validation.validate_batch(boards)
+        self.assertEqual(valid.tolist(), [bitmask_solver.is_viable(board) for board in boards])
+
+    def test_values_too_big_for_int64(self):
+        board = [2 ** 70] + [0] * 80
+        self.assertFalse(validation.validate_batch([board])[0][0])
+        self.assertEqual(validation.conflict_names(board), [])
+
+    def test_values_past_int8_do_not_wrap(self):
+        puzzle, solution = self.pairs[0]
+        board = list(solution)
+        board[0] = 256 + solution[0]  # would wrap to the digit that belongs there
+        self.assertFalse(validation.validate_batch([board])[0][0])
+        self.assertFalse(bitmask_solver.is_viable(board))
+        board = list(solution)
+        ind = solution.index(1)
+        board[ind] = 265  # would wrap to a 9, which the cell's row, column and block already hold
+        self.assertEqual(validation.conflict_names(board), [])
+
+    def test_int8_input(self):
+        puzzle, solution = self.pairs[0]
+        self.assertTrue(validation.validate_batch(np.array([puzzle, solution], dtype=np.int8))[0].all())
+        self.assertTrue(validation.is_complete(np.array([solution], dtype=np.int8))[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
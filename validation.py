@@ -0,0 +1,123 @@
+# Validation of many boards at once with numPy
+# Boards are stacked into an (N, 9, 9) array: rows and columns are its last two axes, and the blocks come from
+# reshaping it to (N, 3, 3, 3, 3) (band, row in band, stack, column in stack) and swapping the middle axes.
+# The digits of every unit are counted with a single np.bincount over all boards (each unit gets its own range of
+# size + 1 bins), so a count above one is a repeated digit. That is about 4x faster than one-hot encoding the units.
+# Larger boards work the same way with (N, size, size) arrays; the board order comes from the shape of the input.
+# Single boards on the solve path are checked by bitmask_solver.is_viable, which is faster for one board
+
+import argparse
+import itertools
+import sys
+import time
+
+import numpy as np
+
+import geometry
+import puzzle_io
+
+
+def unit_names(size=9):  # units are numbered like in batch_solver: rows, then columns, then blocks
+    return (["row " + str(num) for num in range(1, size + 1)] + ["column " + str(num) for num in range(1, size + 1)] +
+            ["block " + str(num) for num in range(1, size + 1)])
+
+
+UNIT_NAMES = unit_names()  # 0 - 8 rows, 9 - 17 columns, 18 - 26 blocks of a 9x9 board
+
+
+def to_array(boards):  # flat boards (81 values for 9x9) or 2D boards (lists or arrays) of one board order -> int8
+    # array of shape (N, size, size). Values outside 0 - size become -1. Raises ValueError if no board order fits
+    boards = np.asarray(boards)
+    num_cells = int(np.prod(boards.shape[1:])) if boards.ndim > 1 else geometry.get_geometry().cells
+    order = geometry.order_of(num_cells)
+    if order is None:
+        raise ValueError("Boards must have 16, 81, 256 or 625 cells, not " + str(num_cells))
+    size = order * order
+    if boards.dtype != np.int8:  # checked before narrowing: 265 would wrap to a 9, and values too big for int64
+        # (an object array) would not cast at all
+        boards = np.where((boards >= 0) & (boards <= size), boards, -1)
+    return boards.astype(np.int8).reshape(-1, size, size)
+
+
+def unit_cells(grids):  # (N, size, size) -> (N, 3 * size, size), the values of every row, column and block
+    size = grids.shape[-1]
+    order = geometry.order_of(size * size)
+    blocks = grids.reshape(-1, order, order, order, order).transpose(0, 1, 3, 2, 4).reshape(-1, size, size)
+    return np.concatenate([grids, grids.transpose(0, 2, 1), blocks], axis=1)
+
+
+def digit_counts(grids):  # (N, 3 * size, size) count of each digit 1 - size in each unit. grids must only hold
+    # 0 - size
+    size = grids.shape[-1]
+    units = unit_cells(grids).astype(np.intp).reshape(-1, size)
+    bins = units + (size + 1) * np.arange(units.shape[0])[:, None]
+    return np.bincount(bins.ravel(), minlength=(size + 1) * units.shape[0]).reshape(-1, 3 * size, size + 1)[:, :, 1:]
+
+
+def validate_batch(boards, min_clues=None):
+    # Checks the same rules as is_viable for every board: values 0 - size, at least min_clues clues (by default 17
+    # on 9x9 boards, see geometry.MIN_CLUES) and no digit twice in a unit. Returns (valid, conflicts): a bool array
+    # of shape (N,) and a bool array of shape (N, 3 * size) that marks the units holding a repeated digit (see
+    # unit_names)
+    grids = to_array(boards)
+    size = grids.shape[-1]
+    if min_clues is None:
+        min_clues = geometry.MIN_CLUES.get(geometry.order_of(size * size), 0)
+    in_range = ((grids >= 0) & (grids <= size)).all(axis=(1, 2))
+    grids = np.where((grids >= 0) & (grids <= size), grids, 0)  # out of range values don't count as digits
+    conflicts = (digit_counts(grids) > 1).any(axis=2)
+    enough_clues = (grids != 0).sum(axis=(1, 2)) >= min_clues
+    return in_range & enough_clues & ~conflicts.any(axis=1), conflicts
+
+
+def is_complete(boards):  # bool array of shape (N,), True for the boards that are filled in and valid
+    grids = to_array(boards)
+    size = grids.shape[-1]
+    in_range = ((grids >= 0) & (grids <= size)).all(axis=(1, 2))
+    grids = np.where(in_range[:, None, None], grids, 0)
+    return in_range & (digit_counts(grids) == 1).all(axis=(1, 2))
+
+
+def conflict_names(board):  # names of the units of one board that repeat a digit, e.g. ["row 1", "block 3"]
+    valid, conflicts = validate_batch([board])
+    names = unit_names(len(conflicts[0]) // 3)
+    return [names[unit] for unit in np.flatnonzero(conflicts[0])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check every puzzle in a file (csv, 81 character lines or 9-line '
+                                                 'grids) and list the ones that are not viable')
+    parser.add_argument('input', help='The input file, or - for stdin')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Puzzles validated per numPy call')
+    parser.add_argument('--order', type=int, choices=geometry.ORDERS, default=geometry.DEFAULT_ORDER,
+                        help='Board order: 3 for 9x9 puzzles (default), 4 for 16x16, 5 for 25x25')
+    cmdline = parser.parse_args()
+
+    names = unit_names(cmdline.order ** 2)
+    num_cells = cmdline.order ** 4
+    symbols = set(puzzle_io.SYMBOLS[:cmdline.order ** 2 + 1])
+    start = time.perf_counter()
+    total = invalid = 0
+    records = puzzle_io.read_puzzles(cmdline.input, errors="keep", order=cmdline.order)
+    while True:
+        chunk = [puzzle for puzzle, solution in itertools.islice(records, cmdline.chunk_size)]
+        if not chunk:
+            break
+        # lines the reader couldn't parse are validated as empty boards and reported as unreadable
+        malformed = np.array([len(puzzle) != num_cells or not set(puzzle) <= symbols for puzzle in chunk], dtype=bool)
+        valid, conflicts = validate_batch([puzzle_io.to_board("0" * num_cells if bad else puzzle)
+                                           for puzzle, bad in zip(chunk, malformed)])
+        valid &= ~malformed
+        for pos in np.flatnonzero(~valid):
+            repeated = [names[unit] for unit in np.flatnonzero(conflicts[pos])]
+            reason = "unreadable" if malformed[pos] else ", ".join(repeated) or "too few clues"
+            print(str(total + pos + 1) + ": " + chunk[pos] + " " + reason)
+        total += len(chunk)
+        invalid += int((~valid).sum())
+    end = time.perf_counter()
+    print("Puzzles: ", total, " not viable: ", invalid, file=sys.stderr)
+    print("Runtime: ", end - start, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()